@@ -0,0 +1,178 @@
+#####################################################################
+##
+## benchmarks.py
+##
+##   Benchmarks of the interpretation engine on synthetic functions
+##   (see generate.py), which report the throughput (in nodes per
+##   second), the peak memory, and the scaling of each interpretation
+##   with the size of the functions, and which can save the results
+##   as a JSON baseline and compare them against an earlier baseline:
+##
+##     python benchmarks.py --save baseline.json
+##     python benchmarks.py --compare baseline.json
+##
+##
+
+import argparse
+import ast
+import contextlib
+import io
+import json
+import linecache
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# The library is imported from the repository (unless it is already on the
+# path), and the example interpretations are defined by the example scripts.
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(root)
+import pydrogen
+import generate
+sys.path.insert(0, os.path.join(root, 'examples'))
+with contextlib.redirect_stdout(io.StringIO()):
+    import examples
+    import analysis
+
+# Each case is an interpretation class, the parameters of the generated
+# functions (restricted to the subset of Python that the interpretation
+# supports), and the context in which they are interpreted.
+cases = {
+    'ASTSize': (pydrogen.ASTSize, {'loops': 0}, {}),
+    'Ty': (examples.Ty, {'loops': 0, 'names': False, 'assignments': False}, {}),
+    'Ty2': (examples.Ty2, {'loops': 1, 'loop': 'while', 'operators': ('Add',)}, {}),
+    'Time': (examples.Time, {'loops': 2, 'names': False}, {}),
+    'Complexity': (analysis.Complexity, {'loops': 2}, {'x': 'n'}),
+}
+
+# A function compiled from generated source code (which is registered so
+# that the source code can be retrieved by inspect, as it is when a
+# function is decorated).
+def compiled(source, name, filename):
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    namespace = {}
+    exec(compile(source, filename, 'exec'), namespace)
+    return namespace[name]
+
+# The shortest of several timings of a computation.
+def timed(compute, repeat):
+    best = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        compute(i)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def measure(name, size, depth, repeat, iterative):
+    (base, parameters, context) = cases[name]
+    # A subclass that does not use the interpretation cache (so that every
+    # run interprets the function) and that uses the selected engine.
+    cls = type(base.__name__, (base,), {'cache': None, 'iterative': iterative, '__module__': base.__module__})
+    source = generate.function(statements = size, depth = depth, **parameters)
+    tree = ast.parse(source)
+    nodes = sum(1 for a in ast.walk(tree))
+
+    # Processing includes retrieving and parsing the source code of a function
+    # (so each run compiles the function again).
+    functions = [
+            compiled(source, 'f', '<benchmark ' + name + ' ' + str(size) + ' ' + str(i) + '>')
+            for i in range(repeat)
+        ]
+    process = timed(lambda i: cls(functions[i], **context), repeat)
+    # The context is a Map, as it is for decorated functions.
+    interpret = timed(lambda i: object.__new__(cls).analyze(tree, pydrogen.Map(context)), repeat)
+
+    tracemalloc.start()
+    object.__new__(cls).analyze(tree, pydrogen.Map(context))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'case': name, 'size': size, 'depth': depth, 'nodes': nodes,
+        'process': process, 'interpret': interpret,
+        'nodes_per_second': nodes / interpret, 'peak_bytes': peak
+    }
+
+# The exponent k of the best fit of time = c * nodes^k (by least squares
+# over the logarithms), which is 1 for interpretations that scale linearly.
+def exponent(results):
+    points = [(math.log(r['nodes']), math.log(r['interpret'])) for r in results]
+    if len(points) < 2:
+        return None
+    mx = sum(x for (x, y) in points) / len(points)
+    my = sum(y for (x, y) in points) / len(points)
+    variance = sum((x - mx) ** 2 for (x, y) in points)
+    return sum((x - mx) * (y - my) for (x, y) in points) / variance if variance > 0 else None
+
+def report(results):
+    print('%-12s %6s %8s %12s %12s %14s %12s' % ('case', 'size', 'nodes', 'process', 'interpret', 'nodes/second', 'peak bytes'))
+    for r in results:
+        print('%-12s %6d %8d %12.6f %12.6f %14.0f %12d' % (
+                r['case'], r['size'], r['nodes'], r['process'], r['interpret'],
+                r['nodes_per_second'], r['peak_bytes']
+            ))
+    print()
+    for name in sorted({r['case'] for r in results}):
+        k = exponent([r for r in results if r['case'] == name])
+        if k is not None:
+            print('The interpretation time of ' + name + ' scales as nodes^' + ('%.2f' % k) + '.')
+
+# Compare the results against a baseline, returning whether any of the
+# interpretation times is slower than the baseline by more than threshold.
+def compare(results, baseline, threshold):
+    earlier = {(r['case'], r['size'], r['depth']): r for r in baseline['results']}
+    regressed = False
+    print()
+    print('%-12s %6s %12s %12s %8s' % ('case', 'size', 'baseline', 'current', 'ratio'))
+    for r in results:
+        b = earlier.get((r['case'], r['size'], r['depth']))
+        if b is None:
+            continue
+        ratio = r['interpret'] / b['interpret']
+        slower = ratio > 1 + threshold
+        regressed = regressed or slower
+        print('%-12s %6d %12.6f %12.6f %8.2f%s' % (
+                r['case'], r['size'], b['interpret'], r['interpret'], ratio,
+                ' slower' if slower else ''
+            ))
+    return regressed
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark interpretations of synthetic functions.')
+    parser.add_argument('--case', action = 'append', choices = sorted(cases), help = 'interpretations to benchmark (by default, all)')
+    parser.add_argument('--sizes', default = '10,20,40,80,160', help = 'comma-separated numbers of statements')
+    parser.add_argument('--depth', type = int, default = 3, help = 'depth of the generated expressions')
+    parser.add_argument('--repeat', type = int, default = 5, help = 'number of timed runs (the fastest is reported)')
+    parser.add_argument('--iterative', action = 'store_true', help = 'use the iterative interpretation engine')
+    parser.add_argument('--save', metavar = 'FILE', help = 'save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar = 'FILE', help = 'compare the results against a JSON baseline')
+    parser.add_argument('--threshold', type = float, default = 0.1, help = 'relative slowdown reported as a regression')
+    args = parser.parse_args(argv)
+
+    results = [
+            measure(name, int(size), args.depth, args.repeat, args.iterative)
+            for name in (args.case or list(cases))
+            for size in args.sizes.split(',')
+        ]
+    report(results)
+
+    if args.save is not None:
+        with open(args.save, 'w') as file:
+            json.dump({
+                    'python': platform.python_version(),
+                    'iterative': args.iterative,
+                    'results': results
+                }, file, indent = 2)
+    if args.compare is not None:
+        with open(args.compare) as file:
+            if compare(results, json.load(file), args.threshold):
+                return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+##eof
@@ -0,0 +1,64 @@
+#####################################################################
+##
+## generate.py
+##
+##   Generators of synthetic Python functions (of a controlled size,
+##   expression depth, loop nesting, and operator mix) on which the
+##   interpretations can be benchmarked.
+##
+##
+
+import random
+
+# The source operators for the names of binary operation handlers.
+operators = {
+    'Add': '+', 'Sub': '-', 'Mult': '*', 'Div': '/', 'Mod': '%',
+    'Pow': '**', 'FloorDiv': '//', 'BitOr': '|', 'BitAnd': '&'
+}
+
+# An expression of the supplied depth whose leaves are numbers or (if
+# any are supplied) the names of variables.
+def expression(rand, depth, ops, names):
+    if depth == 0:
+        if names and rand.random() < 0.5:
+            return rand.choice(names)
+        return str(rand.randint(0, 99))
+    return '(' + expression(rand, depth - 1, ops, names)\
+         + ' ' + operators[rand.choice(ops)] + ' '\
+         + expression(rand, depth - 1, ops, names) + ')'
+
+# The source code of a function named name that consists of the supplied
+# number of statements (each an assignment of an expression of the
+# supplied depth to a new variable if assignments is set, and otherwise
+# an expression statement), nested within the supplied number of loops
+# (for loops over a list of numbers, or while loops on a variable), and
+# followed by a return statement.
+def function(
+        name = 'f', statements = 10, depth = 3, loops = 0,
+        operators = ('Add', 'Sub', 'Mult'), names = True,
+        assignments = True, loop = 'for', seed = 0
+    ):
+    rand = random.Random(seed)
+    lines = ['def ' + name + '(x, y):']
+    variables = ['x', 'y'] if names else []
+    indent = '    '
+    if names and loop == 'while':
+        lines.append(indent + 'c = 1') # The condition of the while loops.
+    for i in range(loops):
+        if loop == 'for':
+            lines.append(indent + 'for i' + str(i) + ' in [1, 2, 3, 4]:')
+        else:
+            lines.append(indent + 'while ' + ('c' if names else '1') + ':')
+        indent += '    '
+    for i in range(statements):
+        e = expression(rand, depth, operators, variables)
+        if assignments:
+            lines.append(indent + 'v' + str(i) + ' = ' + e)
+            if names and indent == '    ': # Only certainly assigned variables.
+                variables.append('v' + str(i))
+        else:
+            lines.append(indent + e)
+    lines.append('    return ' + expression(rand, depth, operators, variables))
+    return '\n'.join(lines) + '\n'
+
+##eof
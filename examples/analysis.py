@@ -1,16 +1,15 @@
 import ast
 import inspect
 import pydrogen
-import sympy
-from sympy import O, symbols, oo
-import sys
+from pydrogen import Order
 
-# some complexity classes using sympy's O notation
-linear = lambda n: O(n, (n, oo))
-quadratic = lambda n: O(n**2, (n,oo))
-logarithmic = lambda n: O(sympy.log(n, 2), (n,oo))
-exponential = lambda n: O(2**n, (n,oo))
-constant = lambda _: O(1)
+# some complexity classes over named size variables (which can be displayed
+# using sympy's O notation with Order.to_sympy)
+linear = lambda n: Order(n)
+quadratic = lambda n: Order(n, 2)
+logarithmic = lambda n: Order(n, 0, 1)
+exponential = lambda n: Order(n, 0, 0, 2)
+constant = lambda _: Order()
 
 class Complexity(pydrogen.Typical):
     """ Complexity approximation for a small subset of Python. """
@@ -20,17 +19,13 @@ class Complexity(pydrogen.Typical):
     # generator, but within the context of loops we say it is linear
     functions = {'len': constant, 'print': constant, 'range': linear}
 
+    # the context maps the arguments of the function to the names of their
+    # size variables
     def preprocess(self, context):
-        syms = []
         # allow for specification of running time of certain functions as well (?)
         if 'functions' in context and type(context['functions']) == dict:
             self.functions.update(context['functions'])
             del context['functions']
-        for var, symbol in context.items():
-            if type(symbol) == str:
-                symbol = symbols(symbol)
-                context[var] = symbol
-            syms.append((symbol, oo))
 
     def Statements(self, ss, context=None): return sum(ss.post(context)[0])
     def Assign(self, targets, e, context=None): return constant(None) + e.post(context)
@@ -56,9 +51,7 @@ class Complexity(pydrogen.Typical):
             loops = constant(None)
         else:
             loops = itr.post(context)
-        work = ss.post(context)
-        # sympy raises error if you try to do O(1) * O(x, (x,oo)) for e.g.
-        return loops * work if work.contains(loops) else work * loops
+        return loops * ss.post(context)
     def BoolOp(self, es, context=None): return constant(None) + sum(es.post(context))
     def BinOp(self, e1, e2, context): return constant(None) + e1.post(context) + e2.post(context)
     def Call(self, func, args, context=None):
@@ -75,13 +68,17 @@ class Complexity(pydrogen.Typical):
                     break
             if symbol or self.functions[func.id] == constant:
                 return self.functions[func.id](symbol)
-        # otherwise, attempt to interpret the function directly
-        for _, module in sys.modules.items():
-            scope = module.__dict__
-            if func.id in scope and callable(scope[func.id]):
-                func = scope[func.id]
-                return Complexity(func, **context, functions=self.functions).Complexity
+        # otherwise, attempt to interpret the function directly (once for
+        # each function and context)
+        callee = self.resolve(func.id)
+        if callee is not None:
+            return self.summary(callee, dict(context, functions=self.functions))
         raise pydrogen.PydrogenError("failed to interpret {}".format(func.id))
+    # a recursive function is assumed to take (at least) linear time in the
+    # first symbol in the context
+    def cycle(self, func, context):
+        names = [s for s in context.values() if type(s) == str]
+        return linear(names[0]) if names else constant(None)
     def Num(self, n, context=None): return 0
     def NameConstant(self): return 0
     def Name(self, id, context=None): return 0
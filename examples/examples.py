@@ -7,6 +7,7 @@
 ##
 ##
 
+import collections
 import pydrogen
 
 #####################################################################
@@ -24,14 +25,16 @@ print("The size of the function body of add() is " + str(add.ASTSize) + ".")
 ##
 
 class Ty(pydrogen.Pydrogen):
-    def Statements(self, ss): return ss.post()[-1] # Last statement.
+    absorbing = ('Error',) # A type error anywhere is a type error of the whole function.
+
+    def Statements(self, ss): return collections.deque(ss.stream(), 1)[0] # Last statement.
     def Module(self, ss): return ss.post()
     def FunctionDef(self, ss): return ss.post()
     def Return(self, e): return e.post()
 
     def True_(self): return 'Bool'
     def False_(self): return 'Bool'
-    def BoolOp(self, es): return 'Bool'if frozenset(es.post()) == {'Bool'} else 'Error'
+    def BoolOp(self, es): return 'Bool' if all(t == 'Bool' for t in es.stream()) else 'Error' # Stops at the first non-boolean.
     def Not(self, e): return 'Bool' if e.post() == 'Bool' else 'Error'
 
     def Num(self, n): return 'Int'
@@ -93,13 +96,17 @@ class Ty2(pydrogen.Typical):
         var = targets.pre()[0].id # Only single variable assignment.
         envNew = env.copy()
         envNew[var] = value.post(env)
-        return ('Void', envNew)
+        return pydrogen.Result('Void', envNew)
     def Name(self, x, env):
         return env[x.pre()] if x.pre() in env else 'Error'
     def Num(self, n, env):
         return 'Int'
     def Add(self, e1, e2, env):
         return 'Int' if {e1.post(env), e2.post(env)} == {'Int'} else 'Error'
+    def Str(self, s, env):
+        return 'Str'
+    def While(self, test, ss, orelse, env): # Variables with conflicting types are errors.
+        return pydrogen.Result('Void', self.fixpoint(ss, env, pydrogen.Environment(pydrogen.Flat('Error'))))
 
 @Ty2
 def example2():
@@ -109,4 +116,23 @@ def example2():
 
 print("The type of example2() is " + str(example2.Ty2) + ".")
 
+@Ty2
+def example3():
+    x = 0
+    y = 1
+    while y:
+        y = y + x
+    return y
+
+print("The type of example3() is " + str(example3.Ty2) + ".")
+
+@Ty2
+def example4():
+    x = 0
+    while x:
+        x = 'abc'
+    return x
+
+print("The type of example4() is " + str(example4.Ty2) + ".")
+
 ##eof
@@ -0,0 +1,7 @@
+## The package exports the library module's definitions, so that
+## interpretation modules can use "import pydrogen" whether the library
+## is installed as a package or its directory is on the module path.
+
+from pydrogen.pydrogen import *
+
+##eof
@@ -0,0 +1,7 @@
+## Entry point for "python -m pydrogen"; see main() in pydrogen.py.
+
+from pydrogen.pydrogen import main
+
+main()
+
+##eof
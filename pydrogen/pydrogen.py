@@ -14,9 +14,32 @@
 ###############################################################################
 ##
 
-import ast     # For working with Python abstract syntax trees.
-import inspect # To retrieve a function body's source code.
-#import sympy  # For symbolic polynomials and other expressions.
+import argparse           # For the command-line interface.
+import ast                # For working with Python abstract syntax trees.
+import asyncio            # For interpretations with asynchronous handlers.
+import collections        # For bounded caches.
+import collections.abc    # For the interface of persistent maps.
+import concurrent.futures # For interpreting many functions in parallel.
+import contextvars        # For limiting the concurrency of asynchronous handlers.
+import fnmatch            # For selecting the files to interpret.
+import functools          # For calling decorated functions directly.
+import hashlib            # For identifying cached interpretations.
+import importlib          # For loading interpretation classes by name.
+import inspect            # To retrieve a function body's source code.
+import json               # For writing interpretations of source files.
+import marshal            # For identifying functions in cached contexts.
+import operator           # For retrieving the children of nodes.
+import os                 # For the interpretation cache directory.
+import pickle             # For storing cached interpretations.
+import sys                # For the Python version of cached interpretations.
+import tempfile           # For writing cached interpretations atomically.
+import textwrap           # For parsing the source code of methods.
+import threading          # For computing deferred interpretations.
+import time               # For profiling interpretations.
+import types              # For binding decorated methods.
+import weakref            # For sharing parsed functions.
+#import sympy             # For displaying complexity classes (imported when used).
+#import numpy              # For batched interpretations (imported when used).
 
 # A PydrogenError occurs if a user of the library tries doing
 # something the library does not currently support.
@@ -38,12 +61,67 @@ class SemanticError(Exception):
     def __str__(self):
         return repr(self.value)
 
+# A Saturated exception signals that the value of the whole tree being
+# interpreted is already known (e.g., because a type error was found),
+# so the rest of the traversal can be skipped. It is raised either by a
+# handler or by the engine when a handler returns one of the absorbing
+# values of its interpretation (see Pydrogen.absorbing), and it unwinds
+# every enclosing handler; the value it carries is the interpretation.
+class Saturated(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+# The source code and the parsed abstract syntax tree of a function,
+# which are shared by every interpretation of the function (including
+# those of stacked decorators and those of handlers that interpret the
+# functions being called). The trees are keyed by the functions' code
+# objects; interpretations must not modify them.
+_parsed = weakref.WeakKeyDictionary()
+
+def parse(func):
+    code = getattr(func, '__code__', None)
+    parsed = None if code is None else _parsed.get(code)
+    if parsed is None:
+        source = textwrap.dedent(inspect.getsource(func))
+        parsed = (source, ast.parse(source))
+        if code is not None:
+            _parsed[code] = parsed
+    return parsed
+
+# An interpretation that is only computed once it is first requested
+# (possibly by more than one thread at once).
+class Deferred():
+    def __init__(self, compute):
+        self._compute = compute
+        self._lock = threading.Lock()
+        self._done = False
+        self._value = None
+    def value(self):
+        if not self._done:
+            with self._lock:
+                if not self._done:
+                    self._value = self._compute()
+                    self._done = True
+                    self._compute = None
+        return self._value
+
 # The result of an alternative interpretation is a Function object
 # that contains annotations for each of the possible alternative
 # interpretations of the function. This makes it possible to
 # "stack" decorators for multiple interpretations above a single
-# function definition.
-class Function():
+# function definition. A Function is a partial application (with no
+# arguments) of the original function, so calling it calls the
+# original function directly; the metadata of the original function
+# (its name, documentation, and so on) is copied when the Function
+# is created, and it binds to instances like a function when it
+# decorates a method.
+class Function(functools.partial):
+    __slots__ = ('_func', '_interpretations', '_parsed')
+    func = args = keywords = None # Replaced below (see _Attribute).
+    def __new__(cls, func, interpreter, interpretation = None):
+        return super().__new__(cls, func._func if type(func) == Function else func)
     def __init__(self, func, cls, interpretation = None):
         # we want to create the Function object with the original function to
         # allow any other stacked interpretations to access it -- this means the
@@ -53,29 +131,482 @@ class Function():
         if type(func) == Function:
             self._interpretations.update(func._interpretations)
             self._func = func._func
+            self._parsed = func._parsed
         else:
             self._func = func
+            self._parsed = None
         self._interpretations[cls.__class__.__name__] = interpretation
+        functools.update_wrapper(self, self._func)
+    # The source code and abstract syntax tree of the function (see parse).
+    def _parse(self):
+        if self._parsed is None:
+            self._parsed = parse(self._func)
+        return self._parsed
     def __getattr__(self, attr):
+        if attr in Function.__slots__: # Not yet assigned.
+            raise AttributeError(attr)
         if (attr in self._interpretations): # Alternative interpretations.
-            return self._interpretations[attr]
+            interpretation = self._interpretations[attr]
+            if type(interpretation) == Deferred:
+                interpretation = interpretation.value()
+                self._interpretations[attr] = interpretation
+            return interpretation
         return getattr(self._func, attr)
-    def __call__(self, *args, **kwargs):
-        return self._func(*args, **kwargs)
+    # Compute any deferred interpretations now (or in a background thread,
+    # which is returned).
+    def warm(self, background = False):
+        if background:
+            thread = threading.Thread(target = self.warm, daemon = True)
+            thread.start()
+            return thread
+        for attr in list(self._interpretations):
+            getattr(self, attr)
+    def __get__(self, instance, owner = None):
+        return self if instance is None else types.MethodType(self, instance)
+    # Like a function, a decorated function is copied and pickled by reference
+    # (as the name it is defined with).
+    def __reduce__(self):
+        return self.__qualname__
     def __repr__(self):
         return repr(self._func)
     def __str__(self):
         return str(self._func)
 
+# The attributes of a partial object that would otherwise hide those of
+# a decorated function (which are retrieved from the function instead,
+# unless they are assigned to the decorated function itself).
+class _Attribute():
+    def __init__(self, name):
+        self.name = name
+    def __get__(self, instance, owner = None):
+        if instance is None:
+            return self
+        return getattr(instance._func, self.name)
+
+(Function.func, Function.args, Function.keywords) = (_Attribute('func'), _Attribute('args'), _Attribute('keywords'))
+
+# A bounded cache of post-interpretation values that are keyed by the
+# context in which they were computed, evicting the least recently used
+# entry once it is full. Hashable contexts are keyed by their value and
+# other contexts (such as dictionaries) by their identity, so the cached
+# values are only valid for interpretations that are pure in their
+# context (and that do not modify a context after using it). The hits
+# and misses are also added up for the interpretation class (if any)
+# that owns the memo (see Pydrogen.memo).
+class Memo():
+    __slots__ = ('size', 'hits', 'misses', 'owner', '_entries')
+    def __init__(self, size = 128, owner = None):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.owner = owner
+        self._entries = collections.OrderedDict()
+    def __len__(self):
+        return len(self._entries)
+    def get(self, context, compute):
+        try:
+            key = (True, context)
+            entry = self._entries.get(key)
+        except TypeError: # Unhashable context.
+            key = (False, id(context))
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not context:
+                entry = None # Identifier of a context that no longer exists.
+        if entry is not None:
+            self.hits += 1
+            if self.owner is not None:
+                self.owner.memo_hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        if self.owner is not None:
+            self.owner.memo_misses += 1
+        result = compute(context)
+        self._entries[key] = (context, result) # Keep the context alive.
+        if len(self._entries) > self.size:
+            self._entries.popitem(last = False)
+        return result
+
+# A directory of interpretations that persists between runs. Each
+# entry is identified by the interpretation class, the function, and
+# the context (the decorator's keyword arguments), and it is valid
+# only for the source code and the interpretation class version that
+# produced it. Entries are written atomically (so concurrent writers
+# cannot corrupt them) and an entry replaces any stale entries for
+# the same class, function, and context. Interpretations within a
+# context that holds a value with no identity that is stable across
+# processes (see _stable) are not cached, and neither are those that
+# depend on the summaries of other functions (see Pydrogen.summary),
+# since those functions may have changed. Failures to write the cache
+# are ignored.
+class Cache():
+    format = 1 # Changed whenever the layout of the cache changes.
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, interpreter, func, source, context):
+        cls = type(interpreter)
+        try:
+            identity = repr((
+                    cls.__module__, cls.__qualname__,
+                    func.__module__, func.__qualname__,
+                    _stable(dict(context))
+                ))
+        except PydrogenError:
+            return None
+        validity = repr((Cache.format, sys.version_info[:2], cls.version, source))
+        return (
+                os.path.join(self.directory, hashlib.sha256(identity.encode()).hexdigest()),
+                hashlib.sha256(validity.encode()).hexdigest() + '.pickle'
+            )
+
+    # Returns a (found, interpretation) pair.
+    def load(self, interpreter, func, source, context):
+        path = self._path(interpreter, func, source, context)
+        if path is None:
+            return (False, None)
+        (folder, name) = path
+        try:
+            with open(os.path.join(folder, name), 'rb') as file:
+                return (True, pickle.load(file))
+        except Exception: # Missing, unreadable, or partially removed entry.
+            return (False, None)
+
+    def store(self, interpreter, func, source, context, interpretation):
+        path = self._path(interpreter, func, source, context)
+        if path is None:
+            return False
+        (folder, name) = path
+        try:
+            data = pickle.dumps(interpretation)
+        except Exception: # Interpretations that cannot be pickled are not cached.
+            return False
+        try:
+            os.makedirs(folder, exist_ok = True)
+            (handle, temporary) = tempfile.mkstemp(dir = folder, suffix = '.tmp')
+        except OSError: # The cache directory cannot be written.
+            return False
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, os.path.join(folder, name))
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return False
+        try:
+            entries = os.listdir(folder)
+        except OSError:
+            entries = []
+        for stale in entries:
+            if stale != name and stale.endswith('.pickle'):
+                try:
+                    os.remove(os.path.join(folder, stale))
+                except OSError: # Already removed by another writer.
+                    pass
+        return True
+
+# A representation of a value within a context that is the same in every
+# process (unlike the default representation of an object, which holds
+# its address). Functions are identified by their names and code, and
+# classes by their names; a PydrogenError is raised for any other value
+# that has no representation of its own (or that is a closure).
+def _stable(value):
+    if value is None or type(value) in (bool, int, float, complex, str, bytes):
+        return value
+    if type(value) in (list, tuple):
+        return (type(value).__name__, tuple(_stable(v) for v in value))
+    if type(value) in (set, frozenset):
+        return (type(value).__name__, tuple(sorted(repr(_stable(v)) for v in value)))
+    if isinstance(value, collections.abc.Mapping):
+        return ('dict', tuple(sorted((repr(_stable(k)), _stable(v)) for (k, v) in value.items())))
+    if type(value) == types.FunctionType:
+        if value.__closure__ or '<locals>' in value.__qualname__:
+            raise PydrogenError("Pydrogen cannot identify this function across processes: " + repr(value))
+        code = hashlib.sha256(marshal.dumps(value.__code__)).hexdigest()
+        return ('function', value.__module__, value.__qualname__, code, _stable(value.__defaults__))
+    if isinstance(value, (type, types.BuiltinFunctionType)):
+        if '<locals>' in value.__qualname__:
+            raise PydrogenError("Pydrogen cannot identify this class across processes: " + repr(value))
+        return (type(value).__name__, value.__module__, value.__qualname__)
+    if type(value).__repr__ is object.__repr__:
+        raise PydrogenError("Pydrogen cannot identify this value across processes: " + repr(value))
+    return (type(value).__module__, type(value).__qualname__, repr(value))
+
+# Hash-consing of abstract syntax trees: every node is assigned the
+# identifier of its structure (its type and the structures of its
+# fields, but not its position in the source), so that structurally
+# identical subtrees (within one function or across functions) share an
+# identifier. The results of interpretations within no context are
+# remembered for each interpretation class and structure, so they are
+# computed only once for all the occurrences of a subtree. This is only
+# valid for interpretations that are pure and that do not depend on the
+# identity or the position of the nodes they interpret.
+class Interner():
+    def __init__(self):
+        self.nodes = 0 # Number of nodes interned.
+        self.hits = 0
+        self.misses = 0
+        self._ids = {}
+        self._known = weakref.WeakKeyDictionary()
+        self._results = {}
+
+    # The number of distinct structures among the interned nodes.
+    def __len__(self):
+        return len(self._ids)
+
+    # The average number of interned nodes that share each structure.
+    def ratio(self):
+        return self.nodes / len(self._ids) if self._ids else 1.0
+
+    def _field(self, value):
+        if isinstance(value, ast.AST):
+            return self._known[value]
+        if type(value) == list:
+            return tuple(self._field(item) for item in value)
+        return (type(value), value) # Distinguishes 1, 1.0, and True.
+
+    # The structural identifier of a node (computed for its descendants
+    # first without recursion, so that the depth of a tree is not limited).
+    def intern(self, a):
+        sid = self._known.get(a)
+        if sid is not None:
+            return sid
+        (known, ids) = (self._known, self._ids)
+        stack = [(a, None)]
+        while stack:
+            (b, values) = stack.pop()
+            if values is None:
+                if b in known:
+                    continue
+                values = [getattr(b, field, None) for field in b._fields]
+                stack.append((b, values))
+                for value in values:
+                    if isinstance(value, ast.AST):
+                        stack.append((value, None))
+                    elif type(value) == list:
+                        stack.extend((c, None) for c in value if isinstance(c, ast.AST))
+                continue
+            key = (type(b),) + tuple(self._field(value) for value in values)
+            known[b] = ids.setdefault(key, len(ids))
+            self.nodes += 1
+        return known[a]
+
+    def key(self, interpreter, a):
+        return (type(interpreter), self.intern(a))
+
+    # Returns a (found, result) pair.
+    def lookup(self, key):
+        if key in self._results:
+            self.hits += 1
+            return (True, self._results[key])
+        self.misses += 1
+        return (False, None)
+
+    def store(self, key, result):
+        self._results[key] = result
+
+    def get(self, interpreter, a, compute):
+        key = self.key(interpreter, a)
+        (found, result) = self.lookup(key)
+        if not found:
+            result = compute()
+            self.store(key, result)
+        return result
+
+# A map that can be copied in constant time, which is suitable for the
+# contexts (such as environments) that are threaded through the
+# interpretation of a sequence of statements (and copied whenever
+# they are updated). The entries are stored in a hash array mapped
+# trie whose nodes are never modified once they are shared, so a
+# copy shares all the nodes of the original, and an update copies
+# only the O(log n) nodes on the path to the updated entry. The set
+# and delete methods return an updated copy (leaving the map itself
+# unchanged).
+class Map(collections.abc.MutableMapping):
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, entries = (), **kwargs):
+        if type(entries) == Map:
+            (self._root, self._size) = (entries._root, entries._size)
+        else:
+            (self._root, self._size) = (_Trie(0, ()), 0)
+            self.update(entries)
+        self.update(kwargs)
+
+    def __getitem__(self, key):
+        (node, h, shift) = (self._root, _hash(key), 0)
+        while True:
+            if type(node) == tuple: # Entries with colliding hashes.
+                for entry in node:
+                    if entry[1] == key:
+                        return entry[2]
+                raise KeyError(key)
+            bit = 1 << ((h >> shift) & 31)
+            if not node.bitmap & bit:
+                raise KeyError(key)
+            entry = node.entries[_popcount(node.bitmap & (bit - 1))]
+            if type(entry) == _Entry:
+                if entry[0] == h and entry[1] == key:
+                    return entry[2]
+                raise KeyError(key)
+            (node, shift) = (entry, shift + 5)
+
+    def __setitem__(self, key, value):
+        (self._root, added) = _insert(self._root, _Entry((_hash(key), key, value)), 0)
+        self._size += added
+
+    def __delitem__(self, key):
+        (root, removed) = _remove(self._root, _hash(key), key, 0)
+        if not removed:
+            raise KeyError(key)
+        (self._root, self._size) = (root if root is not None else _Trie(0, ()), self._size - 1)
+
+    def __iter__(self):
+        return (entry[1] for entry in _entries(self._root))
+    def items(self):
+        return collections.abc.ItemsView(self)
+    def __len__(self):
+        return self._size
+    def __repr__(self):
+        return 'Map({' + ', '.join(repr(k) + ': ' + repr(v) for (h, k, v) in _entries(self._root)) + '})'
+    def __reduce__(self):
+        return (Map, (dict((k, v) for (h, k, v) in _entries(self._root)),))
+
+    def copy(self):
+        return Map(self)
+    def set(self, key, value):
+        updated = Map(self)
+        updated[key] = value
+        return updated
+    def delete(self, key):
+        updated = Map(self)
+        del updated[key]
+        return updated
+
+# The nodes of the trie underlying a Map: each node holds the entries
+# (and the subtries) for the 5-bit segments of the hashes that are set
+# in its bitmap. Entries whose hashes are equal are held in a tuple
+# (below the subtries for all 64 bits of their hashes).
+class _Trie():
+    __slots__ = ('bitmap', 'entries')
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+class _Entry(tuple): # (hash, key, value)
+    __slots__ = ()
+
+_popcount = getattr(int, 'bit_count', lambda x: bin(x).count('1'))
+
+def _hash(key):
+    return hash(key) & 0xFFFFFFFFFFFFFFFF
+
+def _insert(node, entry, shift):
+    if type(node) == tuple:
+        for (i, other) in enumerate(node):
+            if other[1] == entry[1]:
+                return (node[0:i] + (entry,) + node[i + 1:], False)
+        return (node + (entry,), True)
+    bit = 1 << ((entry[0] >> shift) & 31)
+    i = _popcount(node.bitmap & (bit - 1))
+    if not node.bitmap & bit:
+        return (_Trie(node.bitmap | bit, node.entries[0:i] + (entry,) + node.entries[i:]), True)
+    other = node.entries[i]
+    if type(other) == _Entry:
+        if other[0] == entry[0] and other[1] == entry[1]:
+            (child, added) = (entry, False)
+        else:
+            (child, added) = (_pair(other, entry, shift + 5), True)
+    else:
+        (child, added) = _insert(other, entry, shift + 5)
+    return (_Trie(node.bitmap, node.entries[0:i] + (child,) + node.entries[i + 1:]), added)
+
+def _pair(a, b, shift):
+    if shift >= 64: # The hashes are equal.
+        return (a, b)
+    (i, j) = ((a[0] >> shift) & 31, (b[0] >> shift) & 31)
+    if i == j:
+        return _Trie(1 << i, (_pair(a, b, shift + 5),))
+    return _Trie((1 << i) | (1 << j), (a, b) if i < j else (b, a))
+
+def _remove(node, h, key, shift):
+    if type(node) == tuple:
+        remaining = tuple(entry for entry in node if entry[1] != key)
+        if len(remaining) == len(node):
+            return (node, False)
+        return (remaining if len(remaining) > 1 else remaining[0], True)
+    bit = 1 << ((h >> shift) & 31)
+    if not node.bitmap & bit:
+        return (node, False)
+    i = _popcount(node.bitmap & (bit - 1))
+    other = node.entries[i]
+    if type(other) == _Entry:
+        if not (other[0] == h and other[1] == key):
+            return (node, False)
+        child = None
+    else:
+        (child, removed) = _remove(other, h, key, shift + 5)
+        if not removed:
+            return (node, False)
+    if child is None:
+        if node.bitmap == bit:
+            return (None, True)
+        return (_Trie(node.bitmap & ~bit, node.entries[0:i] + node.entries[i + 1:]), True)
+    if type(child) == _Trie and len(child.entries) == 1 and type(child.entries[0]) == _Entry:
+        child = child.entries[0] # A subtrie with a single entry is replaced by the entry.
+    return (_Trie(node.bitmap, node.entries[0:i] + (child,) + node.entries[i + 1:]), True)
+
+def _entries(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) == tuple:
+            yield from node
+            continue
+        for entry in reversed(node.entries):
+            if type(entry) == _Entry:
+                yield entry
+            else:
+                stack.append(entry)
+
+# A handler that updates the context (e.g., an assignment that updates
+# an environment) returns the result of the node together with the
+# updated context as a Result; the updated context is then supplied to
+# the subsequent statements in the same sequence. A Result can also be
+# unpacked like a (value, context) pair.
+class Result():
+    __slots__ = ('value', 'context')
+    def __init__(self, value, context):
+        self.value = value
+        self.context = context
+    def __iter__(self):
+        return iter((self.value, self.context))
+    def __getitem__(self, index):
+        return (self.value, self.context)[index]
+    def __eq__(self, other):
+        return type(other) == Result and (self.value, self.context) == (other.value, other.context)
+    def __hash__(self):
+        return hash((Result, self.value))
+    def __repr__(self):
+        return 'Result(' + repr(self.value) + ', ' + repr(self.context) + ')'
+    def __reduce__(self):
+        return (Result, (self.value, self.context))
+
 # An alternative interpretation algorithm may want access to the
 # abstract syntax subtrees of a node both pre- and post-interpretation.
 # Thus, both are supplied within an instance of the below wrapper class.
 # Note the "lazy" evaluation of post-interpretation values (computed
-# only if they are requested).
+# only if they are requested). If a memo size is supplied, the values
+# are also remembered (see Memo above) so that handlers can request
+# them more than once without recomputing them.
 class Subtree():
-    def __init__(self, pre, post = None):
+    __slots__ = ('_pre', '_post', 'memo')
+    def __init__(self, pre, post = None, memo = None):
         self._pre = pre
         self._post = post
+        self.memo = None if memo is None or post is None else Memo(memo)
     def pre(self):
         return self._pre
     def post(self, context = None):
@@ -85,14 +616,711 @@ class Subtree():
                     + "alternative interpretations of nodes of this type: "\
                     + ast.dump(self._pre)\
                 )
-        result = self._post(context)
-        if type(result) == tuple:
-            if context is None:
-                return result[0] # Discard context.
+        if self.memo is None:
+            result = self._post(context)
+        else:
+            result = self.memo.get(context, self._post)
+        return Subtree._returned(result, context)
+    # The post-interpretation values of a sequence of nodes, one at a time
+    # (see Expressions, which computes each only once it is requested). The
+    # generator returns the context produced by the sequence.
+    def stream(self, context = None):
+        result = self.post(context)
+        if type(result) == Result:
+            yield from result.value
+            return result.context
+        yield from result
+        return context
+    @staticmethod
+    def _returned(result, context):
+        if type(result) == Result and context is None:
+            return result.value # Discard context.
+        return result
+
+# The exception raised while computing a post-interpretation value
+# ahead of time (which is only raised if the value is requested).
+# If the value of a list of nodes failed, the values of the nodes that
+# preceded the failed node are also kept (so they can still be streamed).
+class Failure():
+    __slots__ = ('exception', 'partial')
+    def __init__(self, exception, partial = ()):
+        self.exception = exception
+        self.partial = partial
+
+def _streamed(failure):
+    yield from failure.partial
+    raise failure.exception
+
+# A Subtree whose post-interpretation value within one particular
+# context has already been computed by the iterative interpretation
+# engine (see Pydrogen.iterate). Requests for its value within any
+# other context are handled by an ordinary subtree of the same kind.
+class Speculation(Subtree):
+    __slots__ = ('_p', '_kind', '_context', '_value', '_subtree')
+    def __init__(self, p, kind, pre, context, value):
+        self._pre = pre
+        self._p = p
+        self._kind = kind
+        self._context = context
+        self._value = value
+        self._subtree = None
+    def post(self, context = None):
+        if context is not self._context:
+            if self._subtree is None:
+                self._subtree = self._kind(self._p, self._pre)
+            return self._subtree.post(context)
+        if type(self._value) == Failure:
+            raise self._value.exception
+        return Subtree._returned(self._value, context)
+    def stream(self, context = None):
+        if context is not self._context:
+            if self._subtree is None:
+                self._subtree = self._kind(self._p, self._pre)
+            return self._subtree.stream(context)
+        if type(self._value) == Failure:
+            return _streamed(self._value)
+        return Subtree.stream(self, context)
+
+# Each child of a node is supplied to a handler as a Subtree. The kind
+# of a child is a subclass of Subtree that is constructed from the
+# interpreter and the child (so no closures are allocated to compute
+# its post-interpretation value), and it determines how (and whether)
+# that value is computed.
+class Pre(Subtree):
+    __slots__ = ()
+    def __init__(self, p, x):
+        self._pre = x
+        self._post = None
+        self.memo = None
+
+class Value(Subtree):
+    __slots__ = ()
+    def __init__(self, p, x):
+        self._pre = x
+        self.memo = None
+    def post(self, context = None):
+        return self._pre
+
+class Expression(Subtree):
+    __slots__ = ('_p',)
+    def __init__(self, p, x):
+        self._pre = x
+        self._p = p
+        self.memo = None if p.memo is None else Memo(p.memo, type(p))
+    def _compute(self, context):
+        return self._p.interpret(self._pre, context)
+    def post(self, context = None):
+        if self.memo is None:
+            result = self._p.interpret(self._pre, context)
+        else:
+            result = self.memo.get(context, self._compute)
+        return Subtree._returned(result, context)
+
+class Expressions(Expression):
+    __slots__ = ()
+    def _compute(self, context):
+        return self._p.interprets(self._pre, context)
+    def post(self, context = None):
+        if self.memo is None:
+            result = self._p.interprets(self._pre, context)
+        else:
+            result = self.memo.get(context, self._compute)
+        return Subtree._returned(result, context)
+    # The values of the nodes are computed one at a time (each within the
+    # context produced by the nodes before it) as they are requested, so a
+    # handler that stops requesting them (e.g., once it finds a decisive
+    # value) skips the interpretation of the remaining nodes.
+    def stream(self, context = None):
+        for x in self._pre:
+            r = self._p.interpret(x, context)
+            if type(r) == Result:
+                (r, context) = (r.value, r.context)
+            yield r
+        return context
+
+# The statements of a body are supplied to the Statements handler.
+class Body(Expression):
+    __slots__ = ()
+    def _compute(self, context):
+        return self._p.handle('Statements', Expressions(self._p, self._pre), context)
+    def post(self, context = None):
+        if self.memo is None:
+            result = self._p.handle('Statements', Expressions(self._p, self._pre), context)
+        else:
+            result = self.memo.get(context, self._compute)
+        return Subtree._returned(result, context)
+
+# A batch of contexts within which a tree can be interpreted in a
+# single traversal (see Pydrogen.over). Within a batch, the post-
+# interpretation value of a subtree is a NumPy array that holds its
+# value within each of the contexts. A handler that is batch-aware
+# (see batched below) is called once and is supplied the whole batch
+# as its context (so it can operate on the arrays of values of its
+# subtrees, e.g., by adding them), while any other handler is called
+# once for each of the contexts (or only once if it does not accept
+# a context) and its values are collected into an array.
+class Batch():
+    def __init__(self, contexts, columns = None):
+        self._contexts = list(contexts)
+        self._columns = {} if columns is None else columns
+        self._numpy = _numpy()
+    def __len__(self):
+        return len(self._contexts)
+    def __iter__(self):
+        return iter(self.contexts)
+    def __getitem__(self, index):
+        return self.contexts[index]
+
+    # The contexts themselves (which are only updated with the values of the
+    # variables that were set for the whole batch once they are requested).
+    @property
+    def contexts(self):
+        if self._columns:
+            contexts = [Map(context) for context in self._contexts]
+            for (key, values) in self._columns.items():
+                for (context, value) in zip(contexts, values):
+                    context[key] = value
+            (self._contexts, self._columns) = (contexts, {})
+        return self._contexts
+
+    # The array of the values of a variable within each of the contexts, and
+    # the batch of the contexts updated with an array of values for it.
+    def get(self, key):
+        if key in self._columns:
+            return self._columns[key]
+        return self.array([context[key] for context in self._contexts])
+    def set(self, key, values):
+        values = self._numpy.broadcast_to(values, (len(self._contexts),))
+        return Batch(self._contexts, {**self._columns, key: values})
+
+    # The values of a computation within each of the contexts (which are
+    # all the same if the computation does not depend on the context).
+    def each(self, compute, contextual = True):
+        if not contextual:
+            return self.array([compute(None)] * len(self.contexts))
+        results = [compute(context) for context in self.contexts]
+        if any(type(r) == Result for r in results):
+            return Result(
+                    self.array([r.value if type(r) == Result else r for r in results]),
+                    Batch([r.context if type(r) == Result else c for (r, c) in zip(results, self.contexts)])
+                )
+        return self.array(results)
+
+    # An array of values (of a numeric type if all the values are numbers).
+    def array(self, values):
+        numpy = self._numpy
+        if all(isinstance(v, (int, float, complex, numpy.number, numpy.bool_)) for v in values):
+            return numpy.array(values)
+        array = numpy.empty(len(values), dtype = object)
+        for (i, v) in enumerate(values):
+            array[i] = v
+        return array
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise PydrogenError("Pydrogen requires NumPy for batched interpretations.")
+    return numpy
+
+# Marks a handler as batch-aware (see Batch above).
+def batched(f):
+    f.batched = True
+    return f
+
+# A Syntax entry describes how nodes of a particular type are
+# interpreted: the name of the handler, the children (and their
+# kinds) that are supplied to that handler, and the name of a
+# catch-all handler to use if the first one is not defined. An
+# entry with no handler is transparent (the node is interpreted
+# as its only child).
+class Syntax():
+    def __init__(self, handler, children = (), fallback = None):
+        self.handler = handler
+        self.fallback = fallback
+        self.children = tuple(
+                (kind, operator.attrgetter(field) if type(field) == str else field)
+                for (kind, field) in children
+            )
+        self.leaf = all(kind is Pre or kind is Value for (kind, field) in self.children)
+
+# Some nodes (such as binary operations) are interpreted by different
+# handlers depending on an operator or a value; a Switch entry selects
+# a Syntax entry using a key computed from the node.
+class Switch():
+    def __init__(self, key, cases):
+        self.key = key
+        self.cases = cases
+    def select(self, a):
+        syntax = self.cases.get(self.key(a))
+        if syntax is None:
+            raise PydrogenError("Pydrogen does not currently support nodes of this type: " + ast.dump(a))
+        return syntax
+
+# The number of arguments (other than the instance itself) that a
+# handler accepts, or None if it accepts any number of arguments.
+def _arity(f):
+    try:
+        spec = inspect.getfullargspec(f)
+    except TypeError:
+        return None
+    return None if spec.varargs is not None else len(spec.args) - 1
+
+def _operators(names, children, fallback):
+    return {getattr(ast, name): Syntax(name, children, fallback) for name in names}
+
+def _comparison(a):
+    if not(len(a.ops) == 1 and len(a.comparators) == 1):
+        raise PydrogenError("Pydrogen does not currently support expressions with chained comparison operations.")
+    return type(a.ops[0])
+
+# Constants are distinguished by the type of their value, except for
+# True, False, and None (which are distinguished by the value itself).
+def _constant(a):
+    v = a.value
+    return v if v is None or v is True or v is False else type(v)
+
+# The abstract states computed by an abstract interpretation (such as
+# the environment threaded through the statements of a loop body) are
+# the elements of a lattice. A lattice supplies its least element, the
+# ordering of its elements (leq), their least upper bound (join), and a
+# widening operator that is used to ensure that ascending chains of
+# states stabilize after finitely many steps (by default, a widening is
+# simply a join, which is sufficient for lattices of finite height). The
+# key of a state is a hashable representation of it (see Pydrogen.fixpoint).
+class Lattice():
+    bottom = None
+    def leq(self, a, b): raise PydrogenError("Lattice leq")
+    def join(self, a, b): raise PydrogenError("Lattice join")
+    def widen(self, a, b): return self.join(a, b)
+    def key(self, a): return a
+
+# A flat lattice over arbitrary (hashable) values, in which any two
+# distinct values are incomparable and are joined into the top element.
+class Flat(Lattice):
+    def __init__(self, top = 'Top', bottom = None):
+        self.top = top
+        self.bottom = bottom
+    def leq(self, a, b):
+        return a == self.bottom or a == b or b == self.top
+    def join(self, a, b):
+        if a == self.bottom or a == b:
+            return b
+        if b == self.bottom:
+            return a
+        return self.top
+
+# The lattice of intervals (lo, hi) of numbers (with None as the empty
+# interval), which has infinite ascending chains; its widening replaces
+# any bound that is still changing with an infinite one.
+class Interval(Lattice):
+    def leq(self, a, b):
+        return a is None or (b is not None and b[0] <= a[0] and a[1] <= b[1])
+    def join(self, a, b):
+        if a is None or b is None:
+            return b if a is None else a
+        return (min(a[0], b[0]), max(a[1], b[1]))
+    def widen(self, a, b):
+        if a is None or b is None:
+            return b if a is None else a
+        return (
+                a[0] if a[0] <= b[0] else -float('inf'),
+                a[1] if a[1] >= b[1] else float('inf')
+            )
+
+# The lattice of environments (dictionaries) that map variables to the
+# elements of another lattice pointwise; a missing variable is mapped
+# to the least element of that lattice.
+class Environment(Lattice):
+    def __init__(self, values):
+        self.values = values
+        self.bottom = Map()
+    def _pointwise(self, combine, a, b):
+        bottom = self.values.bottom
+        return Map({x: combine(a.get(x, bottom), b.get(x, bottom)) for x in {**a, **b}})
+    def leq(self, a, b):
+        bottom = self.values.bottom
+        return all(self.values.leq(a[x], b.get(x, bottom)) for x in a)
+    def join(self, a, b):
+        return self._pointwise(self.values.join, a, b)
+    def widen(self, a, b):
+        return self._pointwise(self.values.widen, a, b)
+    def key(self, a):
+        return frozenset((x, self.values.key(v)) for (x, v) in a.items())
+
+# An asymptotic complexity class, such as O(n**2*log(n) + 2**m), over
+# named size variables. Its canonical form is the set of its dominant
+# monomials, each of which is a sorted tuple of (variable, base, power,
+# log) factors that stand for base**variable * variable**power *
+# log(variable)**log (with trivial factors omitted, so that O(1) holds
+# only the empty monomial). A monomial is dominated by another if each
+# of its factors grows no faster than the corresponding factor of the
+# other. A sum keeps the dominant monomials of both classes, and a
+# product multiplies their monomials pairwise; both are memoized, since
+# the classes are hashable. A number stands for O(1) (or, if it is 0,
+# for the empty sum), and sympy is only used to display a class (see
+# to_sympy). The powers and bases must not shrink (i.e., power >= 0,
+# log >= 0, and base >= 1).
+class Order():
+    __slots__ = ('terms', '_hash')
+    def __init__(self, variable = None, power = 1, log = 0, base = 1):
+        if variable is None or (base, power, log) == (1, 0, 0):
+            self._set(frozenset([()]))
+        else:
+            self._set(frozenset([((variable, base, power, log),)]))
+    def _set(self, terms):
+        self.terms = terms
+        self._hash = hash(terms)
+        return self
+
+    @staticmethod
+    def _of(value):
+        if type(value) == Order:
+            return value
+        if isinstance(value, (int, float)):
+            return Order._zero if value == 0 else Order._one
+        raise PydrogenError("Pydrogen cannot treat this value as a complexity class: " + repr(value))
+
+    def __add__(self, other):
+        return object.__new__(Order)._set(_order_sum(self.terms, Order._of(other).terms))
+    __radd__ = __add__
+    def __mul__(self, other):
+        return object.__new__(Order)._set(_order_product(self.terms, Order._of(other).terms))
+    __rmul__ = __mul__
+
+    # Whether every function in the other class is in this class.
+    def contains(self, other):
+        return all(any(_dominated(m, n) for n in self.terms) for m in Order._of(other).terms)
+
+    def __eq__(self, other):
+        return type(other) == Order and self.terms == other.terms
+    def __hash__(self):
+        return self._hash
+    def __repr__(self):
+        if not self.terms:
+            return '0'
+        return 'O(' + ' + '.join(_monomial(m) for m in sorted(self.terms, reverse = True)) + ')'
+    def __reduce__(self):
+        return (_order, (self.terms,))
+
+    def to_sympy(self):
+        try:
+            import sympy
+        except ImportError:
+            raise PydrogenError("Pydrogen requires sympy to convert complexity classes.")
+        symbols = {}
+        terms = []
+        for m in self.terms:
+            term = sympy.Integer(1)
+            for (v, base, power, log) in m:
+                x = symbols.setdefault(v, sympy.Symbol(str(v), positive = True))
+                term = term * sympy.sympify(base) ** x * x ** power * sympy.log(x) ** log
+            terms.append(term)
+        if not terms:
+            return sympy.Integer(0)
+        return sympy.O(sympy.Add(*terms), *[(x, sympy.oo) for x in symbols.values()])
+
+def _order(terms):
+    return object.__new__(Order)._set(terms)
+
+Order._zero = _order(frozenset())
+Order._one = Order()
+
+def _dominated(m, n):
+    factors = {v: f for (v, *f) in n}
+    return all(f <= factors.get(v, [1, 0, 0]) for (v, *f) in m)
+
+def _dominant(terms):
+    return frozenset(m for m in terms if not any(n != m and _dominated(m, n) for n in terms))
+
+@functools.lru_cache(maxsize = 4096)
+def _order_sum(a, b):
+    return _dominant(a | b)
+
+@functools.lru_cache(maxsize = 4096)
+def _order_product(a, b):
+    products = set()
+    for m in a:
+        for n in b:
+            factors = {v: (base, power, log) for (v, base, power, log) in m}
+            for (v, base, power, log) in n:
+                (b0, p0, l0) = factors.get(v, (1, 0, 0))
+                factors[v] = (b0 * base, p0 + power, l0 + log)
+            products.add(tuple(sorted((v,) + f for (v, f) in factors.items())))
+    return _dominant(products)
+
+def _monomial(m):
+    factors = []
+    for (v, base, power, log) in m:
+        if base != 1:
+            factors.append(str(base) + '**' + str(v))
+        if power != 0:
+            factors.append(str(v) + ('' if power == 1 else '**' + str(power)))
+        if log != 0:
+            factors.append('log(' + str(v) + ')' + ('' if log == 1 else '**' + str(log)))
+    return '*'.join(factors) or '1'
+
+# Builds a copy of a tree in which the expressions that have handlers
+# are replaced by calls to those handlers (see Pydrogen.stage). Every
+# value that the staged code refers to is bound to a name (the values
+# are supplied as arguments when the staged code is run).
+class _Stager():
+    def __init__(self, p):
+        self.p = p
+        self.names = []
+        self.values = []
+
+    def bind(self, value):
+        self.names.append('_pydrogen_' + str(len(self.names)))
+        self.values.append(value)
+        return ast.Name(self.names[-1], ast.Load())
+
+    def visit(self, a):
+        if type(a) == list:
+            return [self.visit(b) for b in a]
+        if not isinstance(a, ast.AST):
+            return a
+        if isinstance(a, ast.expr) and type(getattr(a, 'ctx', None)) in (ast.Load, type(None)):
+            staged = self.stage(a)
+            if staged is not None:
+                return ast.copy_location(staged, a)
+        b = type(a)(**{field: self.visit(getattr(a, field)) for field in a._fields if hasattr(a, field)})
+        return ast.copy_location(b, a)
+
+    def stage(self, a):
+        try:
+            syntax = self.p._syntax(a)
+        except PydrogenError:
+            return None
+        if syntax.handler is None:
+            return None
+        (f, n) = self.p._handlers[syntax.handler]
+        if f is Pydrogen.__dict__.get(f.__name__): # Not defined.
+            return None
+        if type(a) == ast.Call and a.keywords: # Not supplied to the handler.
+            return None
+        args = []
+        for (kind, field) in syntax.children:
+            x = field(a)
+            if kind is Expression:
+                post = self.visit(x)
+            elif kind is Expressions:
+                post = ast.List(self.visit(x), ast.Load())
+            elif kind is Value:
+                post = ast.Name(x, ast.Load()) if type(a) == ast.Name else ast.Constant(x)
+            elif kind is Pre and isinstance(x, ast.expr):
+                post = self.visit(x)
+            elif kind is Pre:
+                post = None
+            else:
+                return None
+            args.append(ast.Call(
+                    self.bind(Subtree),
+                    [self.bind(x)] + ([] if post is None else [
+                        ast.Lambda(
+                            ast.arguments(
+                                posonlyargs = [], args = [ast.arg(arg = '_pydrogen_context')],
+                                kwonlyargs = [], kw_defaults = [], defaults = []
+                            ),
+                            post
+                        )
+                    ]),
+                    []
+                ))
+        args.append(ast.Constant(None))
+        return ast.Call(self.bind(f.__get__(self.p)), args[0:n], [])
+
+# A profile of the interpretations performed (within a with statement)
+# by some interpretation classes and their subclasses. It records, for
+# each node type and handler, the number of calls, the inclusive and
+# exclusive time spent in those calls, the number of post-interpretation
+# values the calls requested from their subtrees, and how many of the
+# calls were made to a catch-all handler (because the named handler is
+# not defined). The dispatch and handler tables of the classes are only
+# replaced with instrumented ones while the profile is active, so there
+# is no cost when no profile is active. If trace is set, the individual
+# calls are also recorded (see chrome).
+class Profile():
+    def __init__(self, *classes, trace = False):
+        self.classes = []
+        pending = list(classes if classes else (Pydrogen,))
+        while pending:
+            cls = pending.pop()
+            if cls not in self.classes:
+                self.classes.append(cls)
+                pending.extend(cls.__subclasses__())
+        self.stats = {} # (node type, handler) to [calls, inclusive, exclusive, posts, fallbacks].
+        self.events = [] if trace else None
+        self._local = threading.local()
+        self._saved = []
+
+    def __enter__(self):
+        entries = {} # Instrumented syntax entries (shared by all the classes).
+        for cls in self.classes:
+            self._saved.append((cls, cls.__dict__['_dispatch'], cls.__dict__['_handlers'], cls.__dict__['_batched']))
+            handlers = {name: self._wrap(cls, name, name, f) for (name, (f, n)) in cls._handlers.items()}
+            dispatch = {}
+            for (t, entry) in cls._dispatch.items():
+                if id(entry) not in entries:
+                    entries[id(entry)] = (entry, self._entry(t, entry))
+                dispatch[t] = entries[id(entry)][1]
+                for syntax in (entry.cases.values() if type(entry) == Switch else [entry]):
+                    if syntax.handler is not None:
+                        (f, n) = cls._handlers[syntax.handler]
+                        handlers[(t.__name__, syntax.handler)] = (self._wrap(cls, t.__name__, syntax.handler, f)[0], n)
+            (cls._dispatch, cls._handlers) = (dispatch, handlers)
+            cls._batched = cls._batched | {key for key in handlers if type(key) == tuple and key[1] in cls._batched}
+        for kind in (Subtree, Speculation, Value, Expression, Expressions, Body):
+            self._saved.append((kind, kind.__dict__['post']))
+            kind.post = self._counted(kind.__dict__['post'])
+        return self
+
+    def __exit__(self, *exception):
+        while self._saved:
+            saved = self._saved.pop()
+            if len(saved) == 2:
+                (kind, kind.post) = saved
             else:
-                return result # With context.
+                (cls, cls._dispatch, cls._handlers, cls._batched) = saved
+        return False
+
+    def _entry(self, t, entry):
+        if type(entry) == Switch:
+            return Switch(entry.key, {key: self._syntax(t, syntax) for (key, syntax) in entry.cases.items()})
+        return self._syntax(t, entry)
+
+    def _syntax(self, t, syntax):
+        if syntax.handler is None:
+            return syntax
+        profiled = Syntax.__new__(Syntax)
+        profiled.__dict__.update(syntax.__dict__)
+        profiled.handler = (t.__name__, syntax.handler)
+        return profiled
+
+    def _wrap(self, cls, label, name, f):
+        entry = self.stats.setdefault((label, name), [0, 0.0, 0.0, 0, 0])
+        fallback = f is not getattr(cls, name, None)
+        local = self._local
+        events = self.events
+        def profiled(*args):
+            frames = local.__dict__.setdefault('frames', [])
+            frame = [time.perf_counter(), 0.0, entry]
+            frames.append(frame)
+            try:
+                return f(*args)
+            finally:
+                elapsed = time.perf_counter() - frame[0]
+                frames.pop()
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] += elapsed - frame[1]
+                entry[4] += fallback
+                if frames:
+                    frames[-1][1] += elapsed
+                if events is not None:
+                    events.append((name, label, frame[0], elapsed, threading.get_ident()))
+        return (profiled, _arity(f))
+
+    def _counted(self, post):
+        local = self._local
+        def counted(subtree, context = None):
+            frames = local.__dict__.get('frames')
+            if frames:
+                frames[-1][2][3] += 1
+            return post(subtree, context)
+        return counted
+
+    # A table of the recorded statistics (in order of exclusive time).
+    def summary(self, limit = None):
+        rows = sorted(
+                ((label, name) + tuple(entry) for ((label, name), entry) in self.stats.items() if entry[0] > 0),
+                key = lambda row: -row[4]
+            )[0:limit]
+        lines = ['%-16s %-16s %8s %12s %12s %8s %9s' % ('node', 'handler', 'calls', 'inclusive', 'exclusive', 'posts', 'fallbacks')]
+        for (label, name, calls, inclusive, exclusive, posts, fallbacks) in rows:
+            lines.append('%-16s %-16s %8d %12.6f %12.6f %8d %9d' % (label, name, calls, inclusive, exclusive, posts, fallbacks))
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.summary()
+
+    # Write the recorded calls as a Chrome trace (in the trace event format
+    # that chrome://tracing and Perfetto can display) to a file or path.
+    def chrome(self, file):
+        if self.events is None:
+            raise PydrogenError("Pydrogen can only export the traces of profiles created with trace = True.")
+        trace = {'traceEvents': [
+                {'name': name, 'cat': label, 'ph': 'X', 'pid': os.getpid(), 'tid': tid,
+                 'ts': start * 1e6, 'dur': elapsed * 1e6}
+                for (name, label, start, elapsed, tid) in self.events
+            ]}
+        if type(file) == str:
+            with open(file, 'w') as handle:
+                json.dump(trace, handle)
         else:
-            return result
+            json.dump(trace, file)
+
+# An index of the functions defined at the top level of the modules
+# that have been imported (or that are added to it explicitly), by
+# name, which interpretations use to resolve the callees of calls.
+# The index is built when it is first used, and it is built again if
+# further modules have been imported since then or if a name cannot
+# be resolved (since a module may have defined it since then); a name
+# that still cannot be resolved is then not looked for again until
+# further modules have been imported. An index that does not include
+# the modules only holds the functions that are added to it.
+class Index():
+    def __init__(self, modules = True):
+        self.modules = modules
+        self._functions = {}
+        self._added = {}
+        self._modules = None # Number of modules when the index was built.
+        self._missing = set() # Names not found since modules were last imported.
+
+    def add(self, name, func):
+        self._added[name] = func
+        self._functions[name] = func
+
+    def _build(self):
+        if self._modules != len(sys.modules):
+            self._missing = set()
+        self._modules = len(sys.modules)
+        functions = {}
+        for module in list(sys.modules.values()) if self.modules else ():
+            for (name, value) in list(getattr(module, '__dict__', {}).items()):
+                if name not in functions and (inspect.isfunction(value) or type(value) == Function):
+                    functions[name] = value
+        functions.update(self._added)
+        self._functions = functions
+
+    # The function with the supplied name (or None if there is none).
+    def resolve(self, name):
+        if self._modules != len(sys.modules):
+            self._build()
+        func = self._functions.get(name)
+        if func is None and name not in self._missing:
+            self._build()
+            func = self._functions.get(name)
+            if func is None:
+                self._missing.add(name)
+        return func
+
+# The summaries (interpretations) of functions that have been computed
+# for other interpretations (see Pydrogen.summary), by code object (or
+# definition node) and then by interpretation class and context, and the
+# summaries that are being computed (within each thread). A function that
+# is being interpreted as a whole (rather than summarized) is pending
+# within any context, i.e., with the key (interpretation class, None).
+_summaries = weakref.WeakKeyDictionary()
+_summarizing = threading.local()
+
+def _pending(code, key, compute):
+    pending = _summarizing.__dict__.setdefault('pending', [])
+    pending.append((code, key))
+    try:
+        return compute()
+    finally:
+        pending.pop()
 
 # The Pydrogen class can be extended to define a new operational
 # semantics or abstract interpretation for abstract syntax trees,
@@ -103,6 +1331,176 @@ class Subtree():
 # definition (https://docs.python.org/3/library/ast.html), with a
 # few deviations to accommodate the usage model for this library.
 class Pydrogen():
+    # The number of post-interpretation values (one per distinct context)
+    # that are remembered by each subtree supplied to a handler; by default,
+    # nothing is remembered. A subclass whose handlers are pure in their
+    # context can enable this if its handlers request the same subtree's
+    # value more than once (which otherwise takes time exponential in the
+    # depth of the nesting). The numbers of values that were (and were not)
+    # found in those memos are added up for each class (and can be reset).
+    memo = None
+    memo_hits = 0
+    memo_misses = 0
+
+    # Whether trees are interpreted using the iterative engine (see the
+    # iterate method) rather than by recursive calls to interpret.
+    iterative = False
+
+    # The directory in which the interpretations of decorated functions are
+    # cached between runs (None if they are not cached), and the version of
+    # the interpretation. The version should be changed whenever the handlers
+    # are changed so that stale cached interpretations are not used.
+    cache = os.environ.get('PYDROGEN_CACHE')
+    version = None
+
+    # Whether the interpretations of decorated functions are only computed
+    # once they are first requested (or warmed; see Function).
+    lazy = False
+
+    # Whether the interpretation of a decorated function is a staged version
+    # of that function (see the stage method) rather than the result of
+    # interpreting it.
+    staged = False
+
+    # The Interner (if any) that shares the interpretations (within no
+    # context) of structurally identical subtrees; it can itself be shared
+    # by many interpretation classes.
+    interner = None
+
+    # The index used to resolve the names of called functions (see the
+    # resolve method), and the namespace of the function being interpreted
+    # (if any), in which those names are resolved first.
+    index = Index()
+    _namespace = None
+    _summarized = False
+
+    # The lattice of abstract states used by the fixpoint method (if none
+    # is supplied when it is called), and the number of iterations of a
+    # loop body after which the states at the head of the loop are widened
+    # rather than joined.
+    lattice = None
+    widening = 3
+
+    # The values that absorb every other value of the interpretation (such
+    # as an 'Error' type, or the top of a lattice): once a handler returns
+    # one of them, it is the value of the whole tree (see Saturated).
+    absorbing = ()
+
+    # The syntax table for the supported subset of Python. A subclass can
+    # support additional node types (or override the entries below) by
+    # defining its own 'syntax' dictionary, which is merged with those of
+    # its base classes when the subclass is defined, e.g.:
+    #
+    #   class Ty3(Ty):
+    #       syntax = {ast.AugAssign: Syntax('AugAssign', ((Pre, 'target'), (Expression, 'value')))}
+    #       def AugAssign(self, target, e): ...
+    syntax = {
+        ast.Module: Syntax('Module', ((Body, 'body'),)),
+        ast.FunctionDef: Syntax('FunctionDef', ((Body, 'body'),)),
+        ast.Return: Syntax('Return', ((Expression, 'value'),)),
+        ast.Assign: Syntax('Assign', ((Pre, 'targets'), (Expression, 'value'))),
+        ast.For: Syntax('For', ((Pre, 'target'), (Expression, 'iter'), (Body, 'body'), (Body, 'orelse'))),
+        ast.While: Syntax('While', ((Expression, 'test'), (Body, 'body'), (Body, 'orelse'))),
+        ast.If: Syntax('If', ((Expression, 'test'), (Body, 'body'), (Body, 'orelse'))),
+        ast.Expr: Syntax(None, ((Expression, 'value'),)),
+        ast.Pass: Syntax('Pass'),
+        ast.Break: Syntax('Break'),
+        ast.Continue: Syntax('Continue'),
+
+        ast.BoolOp: Switch(
+                lambda a: type(a.op),
+                _operators(['And', 'Or'], ((Expressions, 'values'),), 'BoolOp')
+            ),
+        ast.BinOp: Switch(
+                lambda a: type(a.op),
+                _operators(
+                    ['Add', 'Sub', 'Mult', 'MatMult', 'Div', 'Mod', 'Pow',
+                     'LShift', 'RShift', 'BitOr', 'BitXor', 'BitAnd', 'FloorDiv'],
+                    ((Expression, 'left'), (Expression, 'right')),
+                    'BinOp'
+                )
+            ),
+        ast.UnaryOp: Switch(
+                lambda a: type(a.op),
+                _operators(['Invert', 'Not', 'UAdd', 'USub'], ((Expression, 'operand'),), 'UnaryOp')
+            ),
+        ast.Set: Syntax('Set', ((Expressions, 'elts'),)),
+        ast.Compare: Switch(
+                _comparison,
+                _operators(
+                    ['Eq', 'NotEq', 'Lt', 'LtE', 'Gt', 'GtE', 'Is', 'IsNot', 'In', 'NotIn'],
+                    ((Expression, 'left'), (Expression, lambda a: a.comparators[0])),
+                    'Compare'
+                )
+            ),
+        ast.Call: Syntax('Call', ((Pre, 'func'), (Expressions, 'args'))),
+        ast.Constant: Switch(
+                _constant,
+                {
+                    int: Syntax('Num', ((Value, 'value'),)),
+                    float: Syntax('Num', ((Value, 'value'),)),
+                    complex: Syntax('Num', ((Value, 'value'),)),
+                    str: Syntax('Str', ((Value, 'value'),)),
+                    bytes: Syntax('Bytes', ((Value, 'value'),)),
+                    True: Syntax('True_', (), 'NameConstant'),
+                    False: Syntax('False_', (), 'NameConstant'),
+                    None: Syntax('None_', (), 'NameConstant')
+                }
+            ),
+        ast.Name: Syntax('Name', ((Value, 'id'),)),
+        ast.List: Syntax('List', ((Expressions, 'elts'),)),
+        ast.Tuple: Syntax('Tuple', ((Expressions, 'elts'),))
+    }
+
+    # Every subclass gets its own dispatch table (built from its own syntax
+    # table and those of its base classes) and its own handler table when
+    # it is defined. The handler table maps each handler name to the
+    # function that should actually be called (which is the catch-all
+    # handler if the named handler is not defined by the subclass) and to
+    # the number of arguments that function accepts. This allows users to
+    # completely ignore the context argument if they do not need contexts
+    # in their alternative interpretation.
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._tabulate()
+        (cls.memo_hits, cls.memo_misses) = (0, 0) # Not those of the base class.
+
+    @classmethod
+    def _tabulate(cls):
+        cls._dispatch = {}
+        for c in reversed(cls.__mro__):
+            cls._dispatch.update(c.__dict__.get('syntax', {}))
+
+        entries = [Syntax('Statements')]
+        for syntax in cls._dispatch.values():
+            if type(syntax) == Switch:
+                entries.extend(syntax.cases.values())
+            else:
+                entries.append(syntax)
+
+        cls._handlers = {}
+        for syntax in entries:
+            if syntax.handler is None or syntax.handler in cls._handlers:
+                continue
+            name = syntax.handler
+            if syntax.fallback is not None and not cls._defines(name):
+                name = syntax.fallback
+            f = getattr(cls, name, None)
+            if f is None:
+                raise PydrogenError("Pydrogen syntax table refers to an unknown handler: " + name)
+            cls._handlers[syntax.handler] = (f, _arity(f))
+        cls._batched = frozenset(
+                name for (name, (f, n)) in cls._handlers.items()
+                if getattr(f, 'batched', False)
+            )
+
+    # A handler is defined by a class if it is not the default handler (which
+    # raises a SemanticError) inherited from the Pydrogen class.
+    @classmethod
+    def _defines(cls, name):
+        f = getattr(cls, name, None)
+        return f is not None and f is not Pydrogen.__dict__.get(name)
+
     def __new__(cls, arg = None, **kwargs):
         # Either create a new object of this class in order to
         # process functions in the future (if no function is
@@ -117,25 +1515,229 @@ class Pydrogen():
             # expects a function to process.
             return lambda func: cls(arg=func, **kwargs)
         elif hasattr(arg, '__call__'): # Is a function.
-            return object.__new__(cls).process(arg, context=kwargs)
+            return object.__new__(cls).process(arg, context=Map(kwargs))
         else:
-            return object.__new__(cls).interpret(arg, context=kwargs)
+            return object.__new__(cls).evaluate(arg, context=Map(kwargs))
 
     def process(self, func, context):
-        original = func._func if type(func) == Function else func
+        function = Function(func, self)
+        compute = self._staged if self.staged else self._interpretation
+        if self.lazy:
+            interpretation = Deferred(lambda: compute(function, context))
+        else:
+            interpretation = compute(function, context)
+        function._interpretations[self.__class__.__name__] = interpretation
+        return function
+
+    def _interpretation(self, function, context):
+        (source, tree) = function._parse()
+        self._namespace = function._func.__globals__
+        self._summarized = False
+        if self.cache is not None:
+            cache = Cache(self.cache)
+            (found, interpretation) = cache.load(self, function._func, source, context)
+            if found:
+                return interpretation
+            key = dict(context) # The preprocessing below may modify the context.
+        interpretation = _pending(function._func.__code__, (type(self), None), lambda: self.analyze(tree, context))
+        if self.cache is not None and not self._summarized:
+            cache.store(self, function._func, source, key, interpretation)
+        return interpretation
+
+    def analyze(self, tree, context):
         # allow subclasses to specify a preprocessing function to populate the
         # context
         if hasattr(self, 'preprocess'):
             self.preprocess(context)
-        return Function(func, self,
-                self.interpret(ast.parse(inspect.getsource(original)), context))
+        return self.evaluate(tree, context)
+
+    # Interpret a whole tree using the engine selected by the class.
+    def evaluate(self, a, context = None):
+        try:
+            if self.iterative and type(context) != Batch: # Batches are interpreted recursively.
+                return self.iterate(a, context)
+            return self.interpret(a, context)
+        except Saturated as saturated:
+            return saturated.value
+
+    # The tree of a function (whose namespace is then used to resolve names)
+    # or a tree.
+    def _tree(self, arg):
+        if hasattr(arg, '__call__'): # Is a function.
+            function = Function(arg, self)
+            self._namespace = function._func.__globals__
+            return function._parse()[1]
+        return arg
+
+    # Interpret a function (or a tree) within each of the supplied contexts
+    # in a single traversal (see Batch), returning an array of the values.
+    @classmethod
+    def over(cls, arg, contexts):
+        interpreter = object.__new__(cls)
+        tree = interpreter._tree(arg)
+        batch = Batch(Map(context) for context in contexts)
+        if hasattr(interpreter, 'preprocess'):
+            for context in batch:
+                interpreter.preprocess(context)
+        result = interpreter.evaluate(tree, batch)
+        return result.value if type(result) == Result else result
+
+    # Partially evaluate the interpretation over the body of a function once,
+    # producing an ordinary Python function in which every expression that
+    # has a handler defined by this class is replaced by a direct call to
+    # that (bound) handler. The Subtree arguments of each call hold the
+    # original nodes, and their post-interpretation values are computed by
+    # evaluating the (staged) children of the expression. Statements (and
+    # expressions without handlers, as well as calls with keyword arguments,
+    # which are not supplied to handlers) retain their usual semantics, and the
+    # handlers are not supplied a context. Within a staged function, the
+    # post-interpretation value of a variable (i.e., of the child of a Name
+    # node) is the value of that variable, and the callee of a Call node
+    # also has a post-interpretation value.
+    def stage(self, func):
+        return self._staged(func if type(func) == Function else Function(func, self), None)
+
+    def _staged(self, function, context):
+        original = function._func
+        code = original.__code__
+        stager = _Stager(self)
+        definition = stager.visit(function._parse()[1].body[0])
+        definition.decorator_list = []
+        # The handlers, original nodes, and closure variables are supplied as
+        # the arguments of a function that defines the staged function.
+        names = stager.names + list(code.co_freevars)
+        factory = ast.FunctionDef(
+                name = '_pydrogen_stage',
+                args = ast.arguments(
+                    posonlyargs = [], args = [ast.arg(arg = name) for name in names],
+                    kwonlyargs = [], kw_defaults = [], defaults = []
+                ),
+                body = [definition, ast.Return(ast.Name(definition.name, ast.Load()))],
+                decorator_list = []
+            )
+        module = ast.fix_missing_locations(ast.Module(body = [factory], type_ignores = []))
+        ast.increment_lineno(module, code.co_firstlineno - 1)
+        namespace = {}
+        exec(compile(module, code.co_filename, 'exec'), original.__globals__, namespace)
+        try:
+            cells = [cell.cell_contents for cell in original.__closure__ or ()]
+        except ValueError:
+            raise PydrogenError("Pydrogen cannot stage functions with unassigned closure variables.")
+        return namespace['_pydrogen_stage'](*stager.values, *cells)
+
+    # The function with the supplied name (e.g., the callee of a call) in the
+    # namespace of the function being interpreted or, failing that, in the
+    # index (or None if there is no function with that name).
+    def resolve(self, name):
+        if self._namespace is not None:
+            value = self._namespace.get(name)
+            if inspect.isfunction(value) or type(value) in (Function, ast.FunctionDef):
+                return value
+        return self.index.resolve(name)
+
+    # The interpretation (according to this class) of a function called by
+    # the function being interpreted, within the supplied context. This is
+    # computed once for each function, class, and context (and is otherwise
+    # retrieved), so an analysis of a whole program is linear in the number
+    # of functions rather than in the number of paths through the call graph.
+    # If a function (directly or indirectly) calls itself, the summary that
+    # is requested while the same summary is being computed (or while the
+    # function is being interpreted as a whole) is supplied by the cycle
+    # method. The function can also be a definition node that was
+    # resolved within the namespace of an Incremental interpretation.
+    def summary(self, func, context = None):
+        self._summarized = True # The interpretation depends on another function.
+        context = Map(context if context is not None else {})
+        key = (type(self), repr(sorted(context.items(), key = lambda item: repr(item[0]))))
+        if type(func) == ast.FunctionDef:
+            code = func
+            compute = lambda: _analyze(type(self), func, context, self._namespace)
+        else:
+            function = Function(func, self)
+            (func, code) = (function._func, function._func.__code__)
+            compute = lambda: object.__new__(type(self))._interpretation(function, context)
+        summaries = _summaries.setdefault(code, {})
+        if key in summaries:
+            return summaries[key]
+        pending = _summarizing.__dict__.setdefault('pending', [])
+        if (code, key) in pending or (code, (type(self), None)) in pending:
+            return self.cycle(func, context)
+        interpretation = _pending(code, key, compute)
+        summaries[key] = interpretation
+        return interpretation
+
+    # The summary of a function that is requested while it is being computed
+    # (i.e., of a recursive function). An interpretation that can summarize
+    # recursive functions (e.g., by assuming a conservative summary that is
+    # then refined) can override this method.
+    def cycle(self, func, context):
+        name = func.name if type(func) == ast.FunctionDef else func.__qualname__
+        raise PydrogenError("Pydrogen cannot summarize the recursive function '" + name + "'.")
+
+    # Compute the abstract state at the head of a loop, i.e., the least state
+    # (above the state on entry to the loop) that is stable under the body of
+    # the loop. The body is either a Subtree holding a list of statements
+    # (which are interpreted in order, threading the state through them as a
+    # context) or a function from states to states. The states reaching the
+    # head of the loop are joined until the delay (by default, the widening
+    # class attribute) is exceeded and are widened thereafter, so that the
+    # iteration terminates for lattices without infinite ascending chains;
+    # a PydrogenError is raised if it has not converged after the number of
+    # iterations in limit. The state at the head of a loop body (supplied as
+    # a Subtree) is remembered for each entry state, so that a loop nested
+    # within another loop is only analyzed again if its entry state changes.
+    def fixpoint(self, body, state, lattice = None, delay = None, limit = 1000):
+        lattice = self.lattice if lattice is None else lattice
+        delay = self.widening if delay is None else delay
+        if lattice is None:
+            raise PydrogenError("Pydrogen requires a lattice to compute a fixpoint.")
+        if not isinstance(body, Subtree):
+            (transfer, key) = (body, None)
+        else:
+            transfer = lambda state: self._transfer(body.pre(), state)
+            key = (id(body.pre()), id(lattice), lattice.key(state))
+            fixpoints = self.__dict__.setdefault('_fixpoints', {})
+            if key in fixpoints:
+                return fixpoints[key][1]
+
+        # A worklist of the states that still have to be propagated through
+        # the body of the loop (to the head of the loop).
+        head = state
+        worklist = [state]
+        iterations = 0
+        while worklist:
+            reached = transfer(worklist.pop())
+            iterations += 1
+            if lattice.leq(reached, head):
+                continue
+            if iterations > limit:
+                raise PydrogenError("Pydrogen could not compute a fixpoint within " + str(limit) + " iterations.")
+            combine = lattice.join if iterations <= delay else lattice.widen
+            head = combine(head, reached)
+            worklist.append(head)
+
+        if key is not None:
+            fixpoints[key] = (body.pre(), head) # Keep the statements alive.
+        return head
+
+    def _transfer(self, ss, state):
+        result = self.interprets(ss, state)
+        if type(result) != Result:
+            raise PydrogenError("Pydrogen requires the statements of a loop body to thread a state.")
+        return result.context
 
     # Attempt running the function with only the number of arguments
-    # that it can handle. This allows users to completely ignore the
-    # context argument if they do not need contexts in their alternative
-    # interpretation.
+    # that it can handle.
     def attempt(self, f, *args):
-        return f(*args[0:len(inspect.getargspec(f).args)-1])
+        return f(*args[0:_arity(f)])
+
+    # Call the handler with the supplied name (as resolved in the handler
+    # table) on as many of the arguments as it can handle.
+    def handle(self, name, *args):
+        (f, n) = self._handlers[name]
+        if args and type(args[-1]) == Batch and name not in self._batched:
+            return args[-1].each(lambda c: f(self, *(args[:-1] + (c,))[0:n]), n is None or n >= len(args))
+        return f(self, *args[0:n])
 
     # Interpret a list of abstract syntax tree nodes in order, threading the
     # context through the process (or throwing it away if it is not supplied).
@@ -143,221 +1745,184 @@ class Pydrogen():
         rs = []
         for s in ss:
             r = self.interpret(s, context)
-            if type(r) == tuple:
-                (r, context) = r
+            if type(r) == Result:
+                (r, context) = (r.value, r.context)
             rs.append(r)
         if context is None:
             return rs
         else:
-            return (rs, context)
+            return Result(rs, context)
 
     # Interpret a single abstract syntax tree node by calling the appropriate
-    # (user-overloaded) handler for that node. Note that we attempt to use a
-    # handler that can accept a context, and if that fails, we revert to a
-    # call without a context.
+    # (user-overloaded) handler for that node, as determined by the dispatch
+    # and handler tables.
     def interpret(self, a, context = None):
-        if type(a) == ast.Module:
-            body = Subtree(
-                    a.body,
-                    lambda context: self.attempt(
-                        self.Statements,
-                        Subtree(a.body, lambda context: self.interprets(a.body, context)),
-                        context))
-            return self.attempt(self.Module, body, context)
-
-        elif type(a) == ast.FunctionDef:
-            body = Subtree(
-                    a.body,
-                    lambda context: self.attempt(
-                        self.Statements,
-                        Subtree(a.body, lambda context: self.interprets(a.body, context)),
-                        context))
-            return self.attempt(self.FunctionDef, body, context)
-
-        elif type(a) == ast.Return:
-            value = Subtree(a.value, lambda context: self.interpret(a.value, context))
-            return self.attempt(self.FunctionDef, value, context)
-
-        elif type(a) == ast.Assign:
-            value = Subtree(a.value, lambda context: self.interpret(a.value, context))
-            return self.attempt(self.Assign, Subtree(a.targets), value, context)
-
-        elif type(a) == ast.For:
-            iter = Subtree(a.iter, lambda context: self.interpret(a.iter, context))
-            body = Subtree(
-                    a.body,
-                    lambda context: self.attempt(
-                        self.Statements,
-                        Subtree(a.body, lambda context: self.interprets(a.body, context)),
-                        context))
-            orelse = Subtree(
-                    a.orelse,
-                    lambda context: self.attempt(
-                        self.Statements,
-                        Subtree(a.orelse, lambda context: self.interprets(a.orelse, context)),
-                        context))
-            return self.attempt(self.For, Subtree(a.target), iter, body, orelse, context)
-
-        elif type(a) == ast.While:
-            test = Subtree(a.test, lambda context: self.interpret(a.test, context))
-            body = Subtree(
-                    a.body,
-                    lambda context: self.attempt(
-                        self.Statements,
-                        Subtree(a.body, lambda context: self.interprets(a.body, context)),
-                        context))
-            orelse = Subtree(
-                    a.orelse,
-                    lambda context: self.attempt(
-                        self.Statements,
-                        Subtree(a.orelse, lambda context: self.interprets(a.orelse, context)),
-                        context))
-            return self.attempt(self.While, test, body, orelse, context)
-
-        elif type(a) == ast.If:
-            test = Subtree(a.test, lambda context: self.interpret(a.test, context))
-            body = Subtree(
-                    a.body,
-                    lambda context: self.attempt(
-                        self.Statements, Subtree(a.body, lambda context: self.interprets(a.body, context)),
-                        context))
-            orelse = Subtree(
-                    a.orelse,
-                    lambda context: self.attempt(
-                        self.Statements,
-                        Subtree(a.orelse, lambda context: self.interprets(a.orelse, context)),
-                        context))
-            return self.attempt(self.If, test, body, orelse, context)
-
-        elif type(a) == ast.Expr:
-            return self.interpret(a.value, context)
-
-        elif type(a) == ast.Pass:
-            return self.attempt(self.Pass, context)
-
-        elif type(a) == ast.Break:
-            return self.attempt(self.Break, context)
-
-        elif type(a) == ast.Continue:
-            return self.attempt(self.Continue, context)
-
-        elif type(a) == ast.BoolOp:
-            values = Subtree(a.values, lambda context: self.interprets(a.values, context))
-            # Performance is not usually a serious issue in abstract interpretation
-            # and static analysis applications, so we use exceptions.
-            try:
-                if type(a.op) == ast.And: return self.attempt(self.And, values, context)
-                if type(a.op) == ast.Or:  return self.attempt(self.Or, values, context)
-            except SemanticError: # Attempt catch-all definitions if above failed.
-                return self.attempt(self.BoolOp, values, context)
-
-        elif type(a) == ast.BinOp:
-            l = Subtree(a.left, lambda context: self.interpret(a.left, context))
-            r = Subtree(a.right, lambda context: self.interpret(a.right, context))
-            # Performance is not usually a serious issue in abstract interpretation
-            # and static analysis applications, so we use exceptions.
+        if context is None and self.interner is not None:
+            result = self.interner.get(self, a, lambda: self._interpret(a, context))
+            if self.absorbing and self._absorbs(result): # Found (rather than computed).
+                raise Saturated(Subtree._returned(result, None))
+            return result
+        return self._interpret(a, context)
+
+    def _interpret(self, a, context):
+        syntax = self._syntax(a)
+        if syntax.handler is None:
+            return self.interpret(syntax.children[0][1](a), context)
+        return self._apply(syntax, a, context)
+
+    def _syntax(self, a):
+        syntax = self._dispatch.get(type(a))
+        if syntax is None:
+            raise PydrogenError("Pydrogen does not currently support nodes of this type: " + ast.dump(a))
+        if type(syntax) == Switch:
+            syntax = syntax.select(a)
+        return syntax
+
+    def _apply(self, syntax, a, context):
+        (f, n) = self._handlers[syntax.handler]
+        args = [kind(self, field(a)) for (kind, field) in syntax.children]
+        if type(context) == Batch and syntax.handler not in self._batched:
+            return context.each(lambda c: f(self, *(args + [c])[0:n]), n is None or n > len(args))
+        args.append(context)
+        result = f(self, *args[0:n])
+        if self.absorbing and self._absorbs(result):
+            raise Saturated(Subtree._returned(result, None))
+        return result
+
+    # Whether the result of a handler is one of the absorbing values.
+    def _absorbs(self, result):
+        try:
+            return Subtree._returned(result, None) in self.absorbing
+        except Exception: # Values that cannot be compared (such as arrays).
+            return False
+
+    # Interpret a tree without recursion by maintaining an explicit stack of
+    # suspended node interpretations (see _task below), so that the depth of
+    # the tree is limited only by the available memory. The children of every
+    # node are interpreted (in order, threading the context) before the node's
+    # handler is called, and the handler is supplied Speculation subtrees that
+    # already hold their post-interpretation values. These values are computed
+    # within the context received by the node if the handler accepts a context
+    # (and within no context otherwise); if a handler requests a value within
+    # any other context, that value is computed recursively as usual. Errors
+    # that occur while interpreting a child are only raised if the handler
+    # requests that child's value (and so is the saturation of a child; see
+    # Saturated). This engine is only appropriate for interpretations whose
+    # handlers do not have side effects.
+    def iterate(self, a, context = None):
+        key = self._interned(a, context)
+        if key is not None:
+            (found, result) = self.interner.lookup(key)
+            if found:
+                return self._unheld(self._held(result))
+        stack = [self._task(self._syntax(a), a, context)]
+        keys = [key] # The interned structure of each suspended node (if any).
+        result = None
+        while True:
             try:
-                if type(a.op) == ast.Add: return self.attempt(self.Add, l, r, context)
-                if type(a.op) == ast.Sub: return self.attempt(self.Sub, l, r, context)
-                if type(a.op) == ast.Mult: return self.attempt(self.Mult, l, r, context)
-                if type(a.op) == ast.MatMult: return self.attempt(self.MatMult, l, r, context)
-                if type(a.op) == ast.Div: return self.attempt(self.Div, l, r, context)
-                if type(a.op) == ast.Mod: return self.attempt(self.Mod, l, r, context)
-                if type(a.op) == ast.Pow: return self.attempt(self.Pow, l, r, context)
-                if type(a.op) == ast.LShift: return self.attempt(self.LShift, l, r, context)
-                if type(a.op) == ast.RShift: return self.attempt(self.RShift, l, r, context)
-                if type(a.op) == ast.BitOr: return self.attempt(self.BitOr, l, r, context)
-                if type(a.op) == ast.BitXor: return self.attempt(self.BitXor, l, r, context)
-                if type(a.op) == ast.BitAnd: return self.attempt(self.BitAnd, l, r, context)
-                if type(a.op) == ast.FloorDiv: return self.attempt(self.FloorDiv, l, r, context)
-            except SemanticError: # Attempt catch-all definitions if above failed.
-                return self.attempt(self.BinOp, l, r, context)
-
-        elif type(a) == ast.UnaryOp:
-            operand = Subtree(a.operand, lambda context: self.interpret(a.operand, context))
-            # Performance is not usually a serious issue in abstract interpretation
-            # and static analysis applications, so we use exceptions.
+                request = stack[-1].send(result)
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+                key = keys.pop()
+                if key is not None:
+                    self.interner.store(key, result)
+                result = self._held(result)
+                if not stack:
+                    return self._unheld(result)
+                continue
+            except Exception as exception:
+                stack.pop()
+                keys.pop()
+                if not stack:
+                    raise
+                result = Failure(exception)
+                continue
+            (a, context) = request
             try:
-                if type(a.op) == ast.Invert: return self.attempt(self.Invert, operand, context)
-                if type(a.op) == ast.Not: return self.attempt(self.Not, operand, context)
-                if type(a.op) == ast.UAdd: return self.attempt(self.UAdd, operand, context)
-                if type(a.op) == ast.USub: return self.attempt(self.USub, operand, context)
-            except SemanticError: # Attempt catch-all definitions if above failed.
-                return self.attempt(self.UnaryOp, operand, context)
-
-        elif type(a) == ast.Set:
-            return self.attempt(
-                    self.Set,
-                    Subtree(a.elts, lambda context: self.interprets(a.elts, context)),
-                    context)
-
-        elif type(a) == ast.Compare:
-            if not(len(a.ops) == 1 and len(a.comparators) == 1):
-                raise PydrogenError("Pydrogen does not currently support expressions with chained comparison operations.")
-            else:
-                op = a.ops[0]
-                right = a.comparators[0]
-                l = Subtree(a.left, lambda context: self.interpret(a.left, context))
-                r = Subtree(right, lambda context: self.interpret(right, context))
-                # Performance is not usually a serious issue in abstract interpretation
-                # and static analysis applications, so we use exceptions.
+                key = self._interned(a, context)
+                if key is not None:
+                    (found, result) = self.interner.lookup(key)
+                    if found:
+                        result = self._held(result)
+                        continue
+                syntax = self._syntax(a)
+                if syntax.leaf: # Nothing to suspend.
+                    result = self._apply(syntax, a, context)
+                    if key is not None:
+                        self.interner.store(key, result)
+                    continue
+            except Exception as exception:
+                result = Failure(exception)
+                continue
+            stack.append(self._task(syntax, a, context))
+            keys.append(key)
+            result = None
+
+    # An absorbing value of a node is held as a Failure (so that it is only
+    # raised if a handler requests it), except for the value of the root.
+    def _held(self, result):
+        if self.absorbing and self._absorbs(result):
+            return Failure(Saturated(Subtree._returned(result, None)))
+        return result
+
+    def _unheld(self, result):
+        if type(result) == Failure:
+            raise result.exception
+        return result
+
+    def _interned(self, a, context):
+        if context is None and self.interner is not None:
+            return self.interner.key(self, a)
+        return None
+
+    # The interpretation of a single (non-leaf) node, which yields a request
+    # (node, context) for the value of each child and receives that value (or
+    # a Failure).
+    def _task(self, syntax, a, context):
+        if syntax.handler is None:
+            result = yield (syntax.children[0][1](a), context)
+            if type(result) == Failure:
+                raise result.exception
+            return result
+        (f, n) = self._handlers[syntax.handler]
+        inner = context if n is None or n > len(syntax.children) else None
+        args = []
+        for (kind, field) in syntax.children:
+            x = field(a)
+            if kind is Expression:
+                value = yield (x, inner)
+            elif kind is Expressions:
+                value = yield from self._tasks(x, inner)
+            elif kind is Body:
+                (g, m) = self._handlers['Statements']
+                statements = inner if m is None or m > 1 else None
+                value = yield from self._tasks(x, statements)
                 try:
-                    if type(op) == ast.Eq: return self.attempt(self.Eq, l, r, context)
-                    if type(op) == ast.NotEq: return self.attempt(self.NotEq, l, r, context)
-                    if type(op) == ast.Lt: return self.attempt(self.Lt, l, r, context)
-                    if type(op) == ast.LtE: return self.attempt(self.LtE, l, r, context)
-                    if type(op) == ast.Gt: return self.attempt(self.Gt, l, r, context)
-                    if type(op) == ast.GtE: return self.attempt(self.GtE, l, r, context)
-                    if type(op) == ast.Is: return self.attempt(self.Is, l, r, context)
-                    if type(op) == ast.IsNot: return self.attempt(self.IsNot, l, r, context)
-                    if type(op) == ast.In: return self.attempt(self.In, l, r, context)
-                    if type(op) == ast.NotIn: return self.attempt(self.NotIn, l, r, context)
-                except SemanticError: # Attempt catch-all definitions if above failed.
-                    return self.attempt(self.Compare, l, r, context)
-
-        elif type(a) == ast.Call:
-            return self.attempt(
-                    self.Call,
-                    Subtree(a.func),
-                    Subtree(a.args, lambda context: self.interprets(a.args, context)),
-                    context)
-
-        elif type(a) == ast.Num:
-            return self.attempt(self.Num, Subtree(a.n, lambda context: a.n), context)
-
-        elif type(a) == ast.Str:
-            return self.attempt(self.Str, Subtree(a.s, lambda context: a.s), context)
-
-        elif type(a) == ast.Bytes:
-            return self.attempt(self.Bytes, Subtree(a.s, lambda context: a.s), context)
-
-        elif type(a) == ast.NameConstant:
-            # Performance is not usually a serious issue in abstract interpretation
-            # and static analysis applications, so we use exceptions.
-            try:
-                if a.value == True: return self.attempt(self.True_, context)
-                if a.value == False: return self.attempt(self.False_, context)
-                if a.value == None: return self.attempt(self.None_, context)
-            except SemanticError: # Attempt catch-all definitions if above failed.
-                return self.attempt(self.NameConstant, context)
-
-        elif type(a) == ast.Name:
-            return self.attempt(self.Name, Subtree(a.id, lambda context: a.id), context)
-
-        elif type(a) == ast.List:
-            return self.attempt(
-                    self.List,
-                    Subtree(a.elts, lambda context: self.interprets(a.elts, context)),
-                    context)
-
-        elif type(a) == ast.Tuple:
-            return self.attempt(
-                    self.Tuple,
-                    Subtree(a.elts, lambda context: self.interprets(a.elts, context)),
-                    context)
+                    value = g(self, *[Speculation(self, Expressions, x, statements, value), inner][0:m])
+                except Exception as exception:
+                    value = Failure(exception)
+            else:
+                args.append(kind(self, x))
+                continue
+            args.append(Speculation(self, kind, x, inner, value))
+        args.append(context)
+        return f(self, *args[0:n])
 
+    # The interpretation of a list of nodes (as in interprets).
+    def _tasks(self, ss, context):
+        rs = []
+        for s in ss:
+            r = yield (s, context)
+            if type(r) == Failure:
+                return Failure(r.exception, rs)
+            if type(r) == Result:
+                (r, context) = (r.value, r.context)
+            rs.append(r)
+        if context is None:
+            return rs
         else:
-            raise PydrogenError("Pydrogen does not currently support nodes of this type: " + ast.dump(a))
+            return Result(rs, context)
 
     # Special case.
     def Statements(self, ss, context = None): raise SemanticError("Statements (Pydrogen-specific case)")
@@ -422,12 +1987,17 @@ class Pydrogen():
     def False_(self, context = None): raise SemanticError("False")
     def None_(self, context = None): raise SemanticError("None")
 
+Pydrogen._tabulate()
+
 # A simple example extension containing the typical definitions,
 # such as passing the recursive result up through 'Module' and
 # 'FunctionDef' nodes.
 class Typical(Pydrogen):
+    @batched
     def Module(self, ss, context): return ss.post(context)
+    @batched
     def FunctionDef(self, ss, context): return ss.post(context)
+    @batched
     def Return(self, e, context): return e.post(context)
 
 # A simple example extension for computing the size of the abstract
@@ -449,4 +2019,657 @@ class ASTSize(Typical):
     def Compare(self, e1, e2): return 1 + e1.post() + e2.post()
     def NameConstant(self): return 1
 
+# An interpretation whose handlers can be coroutines that await the
+# post-interpretation values of their subtrees (e.g., 'return await
+# e.post(context)'), so that handlers can query slow external oracles
+# (such as solvers or services) without blocking one another. The
+# Expression children of a node are interpreted speculatively (as
+# tasks started before the node's handler is called, within the
+# context that the handler receives if it accepts one), and the
+# elements of a list of expressions are interpreted concurrently if
+# no context is threaded through them; the statements of a body are
+# interpreted in order. If 'concurrency' is not None, at most that
+# many handlers are running at once (not counting the time they spend
+# waiting for the values of their subtrees), which limits the number of
+# concurrent queries to an oracle. Handlers that are not coroutines are
+# also supported (and a value they return that can be awaited, such
+# as that of 'return e.post()', is awaited).
+class AsyncPydrogen(Pydrogen):
+    concurrency = None
+    prefetch = True
+
+    # Interpret a function (or a tree) within an event loop that is already
+    # running (as in 'await Cls.run(f, x = 1)').
+    @classmethod
+    async def run(cls, arg, **context):
+        interpreter = object.__new__(cls)
+        tree = interpreter._tree(arg)
+        context = Map(context)
+        if hasattr(interpreter, 'preprocess'):
+            interpreter.preprocess(context)
+        return await interpreter._evaluate(tree, context)
+
+    def evaluate(self, a, context = None):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError: # No event loop is running.
+            return asyncio.run(self._evaluate(a, context))
+        raise PydrogenError("Pydrogen cannot interpret a tree synchronously within a running event loop (use run).")
+
+    async def _evaluate(self, a, context):
+        self._slots = None if self.concurrency is None else asyncio.Semaphore(self.concurrency)
+        try:
+            return await self.interpret(a, context)
+        except Saturated as saturated:
+            return saturated.value
+
+    def _spawn(self, a, context):
+        return asyncio.ensure_future(self.interpret(a, context))
+
+    # Call a handler once a slot is available (see concurrency above); the
+    # slot is released while the handler waits for the value of a subtree
+    # (see _wait below).
+    async def _call(self, f, args):
+        if self._slots is not None:
+            await self._slots.acquire()
+        holding = _holding.set(self._slots is not None)
+        try:
+            result = f(self, *args)
+            return (await result) if inspect.isawaitable(result) else result
+        finally:
+            held = _holding.get()
+            _holding.reset(holding)
+            if held:
+                self._slots.release()
+
+    async def _wait(self, awaitable):
+        if not _holding.get():
+            return await awaitable
+        self._slots.release()
+        holding = _holding.set(False)
+        try:
+            return await awaitable
+        finally:
+            _holding.reset(holding)
+            try:
+                await self._slots.acquire()
+            except BaseException: # Cancelled before the slot was available.
+                _holding.set(False)
+                raise
+
+    async def handle(self, name, *args):
+        (f, n) = self._handlers[name]
+        return await self._call(f, args[0:n])
+
+    async def interprets(self, ss, context = None):
+        rs = []
+        for s in ss:
+            r = await self.interpret(s, context)
+            if type(r) == Result:
+                (r, context) = (r.value, r.context)
+            rs.append(r)
+        if context is None:
+            return rs
+        else:
+            return Result(rs, context)
+
+    async def interpret(self, a, context = None):
+        syntax = self._syntax(a)
+        if syntax.handler is None:
+            return await self.interpret(syntax.children[0][1](a), context)
+        (f, n) = self._handlers[syntax.handler]
+        args = [_asynchronous[kind](self, field(a)) for (kind, field) in syntax.children]
+        if self.prefetch:
+            inner = context if n is None or n > len(args) else None
+            for arg in args:
+                if type(arg) == _AsyncExpression:
+                    arg._prefetch(inner)
+        args.append(context)
+        try:
+            result = await self._call(f, args[0:n])
+        finally:
+            for arg in args[0:-1]:
+                if type(arg) == _AsyncExpression:
+                    arg._cancel()
+        if self.absorbing and self._absorbs(result):
+            raise Saturated(Subtree._returned(result, None))
+        return result
+
+# The kinds of the children supplied to the handlers of an AsyncPydrogen
+# interpretation, whose post methods are coroutines.
+class _AsyncExpression(Subtree):
+    __slots__ = ('_p', '_task', '_context')
+    def __init__(self, p, x):
+        self._pre = x
+        self._p = p
+        self.memo = None
+        self._task = None
+        self._context = None
+    def _prefetch(self, context):
+        self._task = self._p._spawn(self._pre, context)
+        self._context = context
+    def _cancel(self): # Unrequested values are no longer needed.
+        if self._task is not None:
+            if not self._task.done():
+                self._task.cancel()
+            elif not self._task.cancelled():
+                self._task.exception() # Retrieved (so it is not reported).
+    async def post(self, context = None):
+        if self._task is not None and context is self._context:
+            result = await self._p._wait(self._task)
+        else:
+            result = await self._p._wait(self._p.interpret(self._pre, context))
+        return Subtree._returned(result, context)
+
+class _AsyncExpressions(_AsyncExpression):
+    __slots__ = ()
+    async def post(self, context = None):
+        if context is not None:
+            return Subtree._returned(await self._p._wait(self._p.interprets(self._pre, context)), context)
+        tasks = [self._p._spawn(x, None) for x in self._pre]
+        try:
+            return [Subtree._returned(r, None) for r in await self._p._wait(asyncio.gather(*tasks))]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+class _AsyncBody(_AsyncExpression):
+    __slots__ = ()
+    async def post(self, context = None):
+        statements = _AsyncStatements(self._p, self._pre)
+        return Subtree._returned(await self._p._wait(self._p.handle('Statements', statements, context)), context)
+
+class _AsyncStatements(_AsyncExpression):
+    __slots__ = ()
+    async def post(self, context = None):
+        return Subtree._returned(await self._p._wait(self._p.interprets(self._pre, context)), context)
+
+# Whether the handler being run (within a task) holds a slot.
+_holding = contextvars.ContextVar('_holding', default = False)
+
+_asynchronous = {
+        Pre: Pre, Value: Value, Expression: _AsyncExpression,
+        Expressions: _AsyncExpressions, Body: _AsyncBody
+    }
+
+# Several interpretations can be computed in a single traversal of a
+# tree. The result of fuse(Ty, ASTSize, Time) can be used as a decorator
+# (producing a Function with all of the interpretations) or applied to
+# an abstract syntax tree (producing a dictionary that maps the name of
+# each interpretation class to the interpretation). Each interpretation
+# receives its own copy of the context (the keyword arguments of fuse).
+def fuse(*classes, **kwargs):
+    return Fusion(classes, kwargs)
+
+# The traversal is performed in the same manner as that of the iterative
+# engine (see Pydrogen.iterate): every node is visited once, and then the
+# handler of every interpretation is called with Speculation subtrees
+# that hold the values of the children for that interpretation. Each
+# request (node, ks, contexts) is for the values of a node for the
+# interpretations with the indices in ks (within the corresponding
+# contexts), and the result is a list of values (or Failures) in the
+# same order. As in the iterative engine, the saturation of a child
+# (see Saturated) is only raised if a handler requests its value.
+class Fusion():
+    def __init__(self, classes, context):
+        self.classes = classes
+        self.context = context
+
+    def __call__(self, arg):
+        (members, contexts) = self._members()
+        if hasattr(arg, '__call__'): # Is a function.
+            function = Function(arg, members[0])
+            for member in members:
+                member._namespace = function._func.__globals__
+            values = self.evaluate(members, function._parse()[1], contexts)
+            function._interpretations.update(values)
+            return function
+        else:
+            return self.evaluate(members, arg, contexts)
+
+    def _members(self):
+        members = [object.__new__(cls) for cls in self.classes]
+        contexts = []
+        for member in members:
+            contexts.append(Map(self.context))
+            if hasattr(member, 'preprocess'):
+                member.preprocess(contexts[-1])
+        return (members, contexts)
+
+    def evaluate(self, members, a, contexts):
+        ks = tuple(range(len(members)))
+        stack = [self._task(members, a, ks, contexts, self._syntax(members, a, ks))]
+        result = None
+        while True:
+            try:
+                request = stack[-1].send(result)
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+                if not stack:
+                    break
+                continue
+            (a, ks, contexts) = request
+            groups = self._syntax(members, a, ks)
+            if len(groups) == 1 and groups[0][0].leaf: # Nothing to suspend.
+                result = self._leaf(members, a, ks, contexts, groups[0][0])
+                continue
+            stack.append(self._task(members, a, ks, contexts, groups))
+            result = None
+
+        values = {}
+        for (member, value) in zip(members, result):
+            if _saturated(value):
+                value = value.exception.value
+            elif type(value) == Failure:
+                raise value.exception
+            values[member.__class__.__name__] = value
+        return values
+
+    # Group the positions within ks by the syntax entry that the corresponding
+    # interpretation uses for a node (the dispatch table entry is usually the
+    # same for all of them, so the node only needs to be examined once).
+    def _syntax(self, members, a, ks):
+        entry = members[ks[0]]._dispatch.get(type(a))
+        shared = entry is not None
+        for k in ks:
+            if members[k]._dispatch.get(type(a)) is not entry:
+                shared = False
+                break
+        if shared:
+            try:
+                return [(members[ks[0]]._syntax(a), range(len(ks)))]
+            except Exception as exception:
+                return [(Failure(exception), range(len(ks)))]
+        groups = {}
+        for (i, k) in enumerate(ks):
+            try:
+                syntax = members[k]._syntax(a)
+            except Exception as exception:
+                syntax = Failure(exception)
+            groups.setdefault(syntax, []).append(i)
+        return list(groups.items())
+
+    def _leaf(self, members, a, ks, contexts, syntax):
+        args = [kind(members[ks[0]], field(a)) for (kind, field) in syntax.children]
+        results = []
+        for (k, context) in zip(ks, contexts):
+            (f, n) = members[k]._handlers[syntax.handler]
+            try:
+                results.append(_absorbed(members[k], f(members[k], *(args + [context])[0:n])))
+            except Exception as exception:
+                results.append(Failure(exception))
+        return results
+
+    # The interpretations of a single node; interpretations that use the
+    # same syntax entry for the node share the traversal of its children.
+    def _task(self, members, a, ks, contexts, groups):
+        results = [None] * len(ks)
+        for (syntax, positions) in groups:
+            if type(syntax) == Failure:
+                for i in positions:
+                    results[i] = syntax
+                continue
+            gks = [ks[i] for i in positions]
+            gcs = [contexts[i] for i in positions]
+            if syntax.handler is None:
+                values = yield (syntax.children[0][1](a), gks, gcs)
+                for (i, value) in zip(positions, values):
+                    results[i] = value
+                continue
+            handlers = [members[k]._handlers[syntax.handler] for k in gks]
+            inner = [
+                    context if n is None or n > len(syntax.children) else None
+                    for ((f, n), context) in zip(handlers, gcs)
+                ]
+            args = [[] for k in gks]
+            for (kind, field) in syntax.children:
+                x = field(a)
+                if kind is Expression:
+                    values = yield (x, gks, inner)
+                elif kind is Expressions:
+                    values = yield from self._tasks(x, gks, inner)
+                elif kind is Body:
+                    statements = []
+                    for (k, context) in zip(gks, inner):
+                        m = members[k]._handlers['Statements'][1]
+                        statements.append(context if m is None or m > 1 else None)
+                    sequences = yield from self._tasks(x, gks, statements)
+                    values = []
+                    for (k, sequence, context, outer) in zip(gks, sequences, statements, inner):
+                        (g, m) = members[k]._handlers['Statements']
+                        try:
+                            values.append(g(members[k], *[Speculation(members[k], Expressions, x, context, sequence), outer][0:m]))
+                        except Exception as exception:
+                            values.append(Failure(exception))
+                else:
+                    subtree = kind(members[gks[0]], x) # Independent of the interpretation.
+                    for arg in args:
+                        arg.append(subtree)
+                    continue
+                for (j, k) in enumerate(gks):
+                    args[j].append(Speculation(members[k], kind, x, inner[j], values[j]))
+            for (j, i) in enumerate(positions):
+                (f, n) = handlers[j]
+                args[j].append(gcs[j])
+                try:
+                    results[i] = _absorbed(members[gks[j]], f(members[gks[j]], *args[j][0:n]))
+                except Exception as exception:
+                    results[i] = Failure(exception)
+        return results
+
+    # The interpretations of a list of nodes (as in Pydrogen.interprets);
+    # an interpretation is no longer traversed once it fails.
+    def _tasks(self, ss, ks, contexts):
+        positions = list(range(len(ks)))
+        contexts = list(contexts)
+        rs = [[] for k in ks]
+        results = [None] * len(ks)
+        for s in ss:
+            if not positions:
+                break
+            values = yield (s, [ks[i] for i in positions], [contexts[i] for i in positions])
+            live = []
+            for (i, r) in zip(positions, values):
+                if type(r) == Failure:
+                    results[i] = Failure(r.exception, rs[i])
+                    continue
+                if type(r) == Result:
+                    (r, contexts[i]) = (r.value, r.context)
+                rs[i].append(r)
+                live.append(i)
+            positions = live
+        for i in positions:
+            results[i] = rs[i] if contexts[i] is None else Result(rs[i], contexts[i])
+        return results
+
+# Whether a value within a fused traversal is that of a saturated
+# interpretation, and the result of a handler of a fused interpretation
+# (which is saturated if it is one of the interpretation's absorbing
+# values).
+def _saturated(value):
+    return type(value) == Failure and type(value.exception) == Saturated
+
+def _absorbed(member, result):
+    if member.absorbing and member._absorbs(result):
+        return Failure(Saturated(Subtree._returned(result, None)))
+    return result
+
+# Many functions can be interpreted in parallel by a pool of worker
+# processes. Each item is either a function or a (source, name) pair,
+# where the name identifies a (possibly nested) function definition
+# within the source (e.g., 'Class.method'). The interpretation class
+# (and its interpretations) must be picklable, i.e., defined at the top
+# level of a module. The generator yields (index, name, interpretation,
+# error) tuples as the items are completed, where the index is the
+# position of the item and the error is the exception (such as a
+# PydrogenError, a SemanticError, or a SyntaxError) raised while parsing
+# or interpreting the item (if any). Items are sent to the workers in
+# chunks of the specified size.
+def batch(cls, items, workers = None, chunksize = 1, **kwargs):
+    work = []
+    failed = []
+    for (index, item) in enumerate(items):
+        if type(item) == tuple:
+            (source, name) = item
+        else:
+            func = item._func if type(item) == Function else item
+            name = getattr(func, '__name__', repr(func))
+            try:
+                source = item._parse()[0] if type(item) == Function else parse(func)[0]
+            except Exception as error: # No source code can be retrieved.
+                failed.append((index, name, None, error))
+                continue
+        work.append((index, source, name))
+    yield from failed
+    chunks = [work[i:i + chunksize] for i in range(0, len(work), chunksize)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+        futures = [executor.submit(_batch, cls, chunk, kwargs) for chunk in chunks]
+        for future in concurrent.futures.as_completed(futures):
+            for result in future.result():
+                yield result
+
+def _batch(cls, chunk, context):
+    results = []
+    for (index, source, name) in chunk:
+        try:
+            definition = _definition(ast.parse(source), name)
+            results.append((index, name, _analyze(cls, definition, context), None))
+        except Exception as error: # Reported for this item only.
+            try:
+                pickle.dumps(error)
+            except Exception: # Sent to the parent process as a description.
+                error = PydrogenError(type(error).__name__ + ': ' + str(error))
+            results.append((index, name, None, error))
+    return results
+
+# The function definition with the supplied (qualified) name in a tree.
+def _definition(tree, name):
+    a = tree
+    for part in name.split('.'):
+        for b in getattr(a, 'body', []):
+            if type(b) in (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef) and b.name == part:
+                a = b
+                break
+        else:
+            raise PydrogenError("Pydrogen could not find a definition named '" + name + "'.")
+    return a
+
+# The interpretation of a function definition node (which is interpreted
+# within a module, as it is when a decorated function is processed). If
+# a namespace is supplied, the names of callees are only resolved within
+# it (and not within the modules imported by this process).
+def _analyze(cls, definition, context, namespace = None):
+    tree = ast.Module(body = [definition], type_ignores = [])
+    interpreter = object.__new__(cls)
+    interpreter._namespace = namespace
+    if namespace is not None:
+        interpreter.index = Index(modules = False)
+    return _pending(definition, (cls, None), lambda: interpreter.analyze(tree, Map(context)))
+
+# An incremental interpretation of the function definitions within a
+# collection of source files, which only interprets a definition again
+# if it has changed or if it calls (by name) a definition that has been
+# interpreted again, added, or removed. Interpretations are stored by
+# the file and the fingerprint of the definition's subtree. The callees
+# of calls are resolved (see Pydrogen.resolve) to the top-level
+# definitions within the same file or, failing that, within any of the
+# files, so their summaries are computed from the supplied sources.
+# Each update reports the invalidated definitions (identified as
+# 'file:qualified.name') and the reasons they were invalidated. The
+# state can be saved to a file and loaded again (e.g., by a pre-commit
+# hook).
+class Incremental():
+    def __init__(self, cls, **kwargs):
+        self.cls = cls
+        self.context = kwargs
+        self._definitions = {} # Name -> (node, (file, fingerprint), names of callees).
+        self._results = {}     # (File, fingerprint) -> (interpretation, error).
+
+    def update(self, source, filename = '<source>'):
+        definitions = {}
+        for (name, a) in _definitions(ast.parse(source, filename)):
+            # The callees of identical definitions in different files can be
+            # resolved differently, so their interpretations are not shared.
+            fingerprint = (filename, hashlib.sha256(ast.dump(a).encode()).hexdigest())
+            callees = frozenset(
+                    b.func.id for b in ast.walk(a)
+                    if type(b) == ast.Call and type(b.func) == ast.Name
+                )
+            definitions[filename + ':' + name] = (a, fingerprint, callees)
+
+        reasons = {}
+        previous = {name for name in self._definitions if name.rpartition(':')[0] == filename}
+        for name in previous:
+            _summaries.pop(self._definitions[name][0], None)
+        for name in previous | definitions.keys():
+            if name not in definitions:
+                reasons[name] = 'removed'
+                del self._definitions[name]
+            elif name not in previous:
+                reasons[name] = 'added'
+            elif self._definitions[name][1] != definitions[name][1]:
+                reasons[name] = 'changed'
+        self._definitions.update(definitions)
+
+        # Invalidate the definitions that (transitively) call any of the above.
+        pending = list(reasons)
+        while pending:
+            callee = pending.pop()
+            short = callee.rpartition('.')[2].rpartition(':')[2]
+            for (name, (a, fingerprint, callees)) in self._definitions.items():
+                if name not in reasons and short in callees:
+                    reasons[name] = 'calls ' + callee + ' (' + reasons[callee].split(' (')[0] + ')'
+                    self._results.pop(fingerprint, None)
+                    _summaries.pop(a, None)
+                    pending.append(name)
+
+        namespaces = self._namespaces()
+        for (name, (a, fingerprint, callees)) in self._definitions.items():
+            if fingerprint not in self._results:
+                try:
+                    namespace = namespaces[name.rpartition(':')[0]]
+                    self._results[fingerprint] = (_analyze(self.cls, a, self.context, namespace), None)
+                except Exception as error: # Reported for this definition only.
+                    self._results[fingerprint] = (None, error)
+        current = {fingerprint for (a, fingerprint, callees) in self._definitions.values()}
+        for fingerprint in list(self._results):
+            if fingerprint not in current:
+                del self._results[fingerprint]
+        return sorted(reasons.items())
+
+    # The namespace in which callees are resolved within each file.
+    def _namespaces(self):
+        files = {}
+        for (name, (a, fingerprint, callees)) in self._definitions.items():
+            (file, qualified) = name.rpartition(':')[0::2]
+            if '.' not in qualified:
+                files.setdefault(file, {})[qualified] = a
+        everywhere = {}
+        for functions in files.values():
+            everywhere.update(functions)
+        return collections.defaultdict(
+                lambda: everywhere,
+                {file: collections.ChainMap(functions, everywhere) for (file, functions) in files.items()}
+            )
+
+    # The interpretations (and errors) of the current definitions, by name.
+    def interpretations(self):
+        return {
+                name: self._results[fingerprint][0]
+                for (name, (a, fingerprint, callees)) in self._definitions.items()
+                if self._results[fingerprint][1] is None
+            }
+    def errors(self):
+        return {
+                name: self._results[fingerprint][1]
+                for (name, (a, fingerprint, callees)) in self._definitions.items()
+                if self._results[fingerprint][1] is not None
+            }
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            pickle.dump(self, file)
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+# Every function definition within the Python files in a directory (or
+# within individual files) can be interpreted without importing any of
+# the files, so that no code within them is run. The files are selected
+# by glob patterns (matched against their paths relative to the supplied
+# directories) and each file is parsed only once. The interpretations are
+# written as JSON lines, one for each function definition:
+#
+#   python -m pydrogen examples.analysis:Size src/ --exclude 'tests/*' -j 4
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+            prog = 'python -m pydrogen',
+            description = 'Interpret every function definition within Python source files.'
+        )
+    parser.add_argument('interpretation', help = "interpretation class (e.g., 'module:Class')")
+    parser.add_argument('paths', nargs = '+', help = 'directories and files to interpret')
+    parser.add_argument('--include', action = 'append', default = None, metavar = 'GLOB',
+            help = "files to interpret (default: '*.py')")
+    parser.add_argument('--exclude', action = 'append', default = [], metavar = 'GLOB',
+            help = 'files to skip')
+    parser.add_argument('--context', action = 'append', default = [], metavar = 'KEY=VALUE',
+            help = 'context entries supplied to the interpretation')
+    parser.add_argument('-j', '--jobs', type = int, default = 1,
+            help = 'number of worker processes')
+    args = parser.parse_args(argv)
+
+    (module, _, name) = args.interpretation.replace(':', '.').rpartition('.')
+    sys.path.insert(0, os.getcwd())
+    cls = getattr(importlib.import_module(module), name)
+    context = dict(entry.split('=', 1) for entry in args.context)
+    paths = _files(args.paths, args.include or ['*.py'], args.exclude)
+
+    if args.jobs == 1:
+        outcomes = (_file(cls, path, context) for path in paths)
+        for records in outcomes:
+            _write(records)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = args.jobs) as executor:
+            futures = [executor.submit(_file, cls, path, context) for path in paths]
+            for future in concurrent.futures.as_completed(futures):
+                _write(future.result())
+
+def _files(paths, include, exclude):
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for (folder, folders, names) in os.walk(path):
+            folders.sort()
+            for name in sorted(names):
+                relative = os.path.relpath(os.path.join(folder, name), path).replace(os.sep, '/')
+                if any(fnmatch.fnmatch(relative, pattern) for pattern in include)\
+                   and not any(fnmatch.fnmatch(relative, pattern) for pattern in exclude):
+                    files.append(os.path.join(folder, name))
+    return files
+
+# The records for every function definition within a file (in which
+# the callees of calls are resolved to the top-level definitions within
+# the same file, if there are any).
+def _file(cls, path, context):
+    try:
+        with open(path, 'rb') as file:
+            tree = ast.parse(file.read(), path)
+    except (OSError, SyntaxError, ValueError) as error:
+        return [{'file': path, 'error': type(error).__name__ + ': ' + str(error)}]
+    records = []
+    definitions = list(_definitions(tree))
+    namespace = {name: definition for (name, definition) in definitions if '.' not in name}
+    for (name, definition) in definitions:
+        record = {'file': path, 'function': name, 'line': definition.lineno}
+        try:
+            record['interpretation'] = _analyze(cls, definition, context, namespace)
+        except Exception as error: # Reported for this function only.
+            record['error'] = type(error).__name__ + ': ' + str(error)
+        records.append(record)
+    return records
+
+# The qualified names and nodes of the function definitions within a tree.
+def _definitions(tree, prefix = ''):
+    for a in getattr(tree, 'body', []):
+        if type(a) in (ast.FunctionDef, ast.ClassDef):
+            if type(a) == ast.FunctionDef:
+                yield (prefix + a.name, a)
+            yield from _definitions(a, prefix + a.name + '.')
+
+def _write(records):
+    for record in records:
+        sys.stdout.write(json.dumps(record, default = str) + '\n')
+    sys.stdout.flush()
+
+if __name__ == '__main__':
+    # Use the definitions of the module itself (rather than of this script),
+    # which are the ones that interpretation classes extend.
+    import pydrogen
+    pydrogen.main()
+
 ##eof
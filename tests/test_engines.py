@@ -0,0 +1,76 @@
+#####################################################################
+##
+## test_engines.py
+##
+##   Tests that the recursive, iterative, and fused engines give the
+##   same interpretations (including interpretations that thread a
+##   context through statements), and of staged interpretations.
+##
+##
+
+import ast
+
+import pydrogen
+
+class Cost(pydrogen.Typical):
+    def Statements(self, ss, context): return sum(ss.post(context)[0])
+    def Assign(self, targets, e, context):
+        cost = e.post(context)
+        return pydrogen.Result(1 + cost, context.set(targets.pre()[0].id, cost))
+    def Return(self, e, context): return e.post(context)
+    def Expr(self, e, context): return e.post(context)
+    def If(self, test, body, orelse, context): return test.post(context) + max(body.post(context), orelse.post(context))
+    def Num(self, n, context): return 1
+    def Name(self, id, context): return context.get(id.pre(), 1)
+    def BinOp(self, e1, e2, context): return 1 + e1.post(context) + e2.post(context)
+    def List(self, es, context): return 1 + sum(es.post(context)[0])
+
+sources = [
+    "def f(x):\n    return x + 1\n",
+    "def f(x):\n    y = x + x\n    z = [y, y, 1]\n    return z + x\n",
+    "def f(x):\n    if x:\n        y = x + 1\n        return y\n    else:\n        return [x, 2]\n",
+    "def f(x):\n    x = x + 1\n    x = x + x\n    return x\n",
+]
+
+def engines(cls, tree, **context):
+    return {
+        'recursive': object.__new__(cls).analyze(tree, pydrogen.Map(context)),
+        'iterative': object.__new__(type(cls.__name__, (cls,), {'iterative': True})).analyze(tree, pydrogen.Map(context)),
+        'fused': pydrogen.fuse(cls, **context)(tree)[cls.__name__]
+    }
+
+def test_engines_agree():
+    for source in sources:
+        for context in ({}, {'x': 10}):
+            values = engines(Cost, ast.parse(source), **context)
+            assert len(set(values.values())) == 1, (source, context, values)
+    for source in (sources[0], sources[3]): # ASTSize has no semantics for lists and conditionals.
+        values = engines(pydrogen.ASTSize, ast.parse(source))
+        assert len(set(values.values())) == 1, (source, values)
+
+def test_context_threading():
+    assert set(engines(Cost, ast.parse(sources[3]), x = 10).values()) == {64} # 13 + 26 + 25.
+
+def test_fused_together():
+    tree = ast.parse(sources[3])
+    values = pydrogen.fuse(pydrogen.ASTSize, Cost, x = 10)(tree)
+    assert values == {'ASTSize': engines(pydrogen.ASTSize, tree)['recursive'], 'Cost': engines(Cost, tree, x = 10)['recursive']}
+
+class Evaluate(pydrogen.Pydrogen):
+    staged = True
+    def Call(self, func, args): return func.post()(*args.post())
+    def Add(self, e1, e2): return e1.post() + e2.post()
+
+def test_staged():
+    @Evaluate
+    def f(xs, context):
+        return sorted(xs) + [context + 1]
+    assert f.Evaluate([2, 1], 41) == f([2, 1], 41) == [1, 2, 42]
+
+def test_staged_keywords():
+    @Evaluate
+    def f(xs):
+        return sorted(xs, reverse = True)
+    assert f.Evaluate([2, 1, 3]) == [3, 2, 1]
+
+##eof
@@ -0,0 +1,67 @@
+#####################################################################
+##
+## test_incremental.py
+##
+##   Tests of incremental interpretations, in which callees are
+##   resolved within the same file (or, failing that, any file) and
+##   callers are invalidated when their callees change.
+##
+##
+
+import pydrogen
+
+class Cost(pydrogen.Typical):
+    def Statements(self, ss, context): return sum(ss.post(context)[0])
+    def Return(self, e, context): return e.post(context)
+    def Num(self, n, context): return 1
+    def Name(self, id, context): return context.get(id.pre(), 1)
+    def BinOp(self, e1, e2, context): return 1 + e1.post(context) + e2.post(context)
+    def Call(self, func, args, context):
+        callee = self.resolve(func.pre().id)
+        if callee is None:
+            raise pydrogen.PydrogenError("Cannot resolve '" + func.pre().id + "'.")
+        return 1 + self.summary(callee, context)
+
+caller = "def f(x):\n    return g(x)\n"
+
+def test_same_file_first():
+    inc = pydrogen.Incremental(Cost, x = 10)
+    assert inc.update(caller + "def g(x):\n    return x\n", 'a.py') == [('a.py:f', 'added'), ('a.py:g', 'added')]
+    inc.update(caller + "def g(x):\n    return 1 + x\n", 'b.py')
+    assert inc.interpretations() == {'a.py:f': 11, 'a.py:g': 10, 'b.py:f': 13, 'b.py:g': 12}
+
+def test_invalidation_across_files():
+    inc = pydrogen.Incremental(Cost, x = 10)
+    inc.update(caller + "def g(x):\n    return x\n", 'a.py')
+    inc.update(caller + "def g(x):\n    return 1 + x\n", 'b.py')
+    assert inc.update(caller + "def g(x):\n    return 2 + x + x\n", 'b.py') == [
+            ('a.py:f', 'calls b.py:g (changed)'), ('b.py:f', 'calls b.py:g (changed)'), ('b.py:g', 'changed')
+        ]
+    assert inc.interpretations() == {'a.py:f': 11, 'a.py:g': 10, 'b.py:f': 24, 'b.py:g': 23}
+    inc.update(caller, 'b.py') # The callee of b.py:f is now the one in a.py.
+    assert inc.interpretations() == {'a.py:f': 11, 'a.py:g': 10, 'b.py:f': 11}
+    inc.update("def h(x):\n    return x\n", 'a.py')
+    assert inc.interpretations() == {'a.py:h': 10} and set(inc.errors()) == {'b.py:f'}
+
+def test_unchanged():
+    inc = pydrogen.Incremental(Cost, x = 10)
+    inc.update(caller + "def g(x):\n    return x\n", 'a.py')
+    assert inc.update(caller + "def g(x):\n    return x\n", 'a.py') == []
+
+def test_errors():
+    class Broken(Cost):
+        def Num(self, n, context): raise KeyError('Num')
+    inc = pydrogen.Incremental(Broken, x = 10)
+    inc.update("def f(x):\n    return 1\ndef g(x):\n    return x\n", 'a.py')
+    assert inc.interpretations() == {'a.py:g': 10}
+    assert type(inc.errors()['a.py:f']) == KeyError
+
+def test_save_load(tmp_path):
+    inc = pydrogen.Incremental(Cost, x = 10)
+    inc.update(caller + "def g(x):\n    return x\n", 'a.py')
+    inc.save(str(tmp_path / 'incremental.pickle'))
+    loaded = pydrogen.Incremental.load(str(tmp_path / 'incremental.pickle'))
+    assert loaded.update(caller + "def g(x):\n    return x\n", 'a.py') == []
+    assert loaded.interpretations() == inc.interpretations()
+
+##eof
@@ -0,0 +1,93 @@
+#####################################################################
+##
+## test_map.py
+##
+##   Randomized comparison of the persistent Map (a hash array mapped
+##   trie) against a dictionary, including keys with colliding hashes,
+##   deletions, and snapshots taken along the way:
+##
+##     python -m pytest tests
+##
+##
+
+import pickle
+import random
+
+import pytest
+
+import pydrogen
+
+# A key whose hash is supplied, so that hashes can be made to collide
+# (entirely, or only within their lower bits).
+class Key():
+    def __init__(self, name, h):
+        self.name = name
+        self.h = h
+    def __hash__(self):
+        return self.h
+    def __eq__(self, other):
+        return type(other) == Key and self.name == other.name
+    def __repr__(self):
+        return 'Key(' + repr(self.name) + ')'
+
+def keys(rand, count):
+    hashes = [0, 1, -1, 2**60, 2**60 + 32, 2**35, -2**62, 7]
+    return [
+            Key(i, rand.choice(hashes)) if rand.random() < 0.5 else Key(i, rand.getrandbits(64) - 2**63)
+            for i in range(count)
+        ]
+
+def check(m, d):
+    assert len(m) == len(d)
+    assert dict(m.items()) == d
+    assert set(m) == set(d)
+    for (k, v) in d.items():
+        assert k in m and m[k] == v
+
+def test_random_operations():
+    for seed in range(10):
+        rand = random.Random(seed)
+        ks = keys(rand, 60)
+        (m, d) = (pydrogen.Map(), {})
+        snapshots = []
+        for step in range(600):
+            k = rand.choice(ks)
+            operation = rand.random()
+            if operation < 0.5:
+                m[k] = d[k] = step
+            elif operation < 0.8:
+                if k in d:
+                    del m[k]
+                    del d[k]
+                else:
+                    with pytest.raises(KeyError):
+                        del m[k]
+            elif operation < 0.9:
+                snapshots.append((m.copy(), dict(d)))
+            else:
+                (m, d) = (m.set(k, -step), {**d, k: -step}) if rand.random() < 0.5 or k not in d\
+                    else (m.delete(k), {j: v for (j, v) in d.items() if j != k})
+            check(m, d)
+        for (snapshot, expected) in snapshots: # Unaffected by later updates.
+            check(snapshot, expected)
+
+def test_collisions_collapse():
+    ks = [Key(i, 42) for i in range(10)]
+    m = pydrogen.Map((k, k.name) for k in ks)
+    check(m, {k: k.name for k in ks})
+    for k in ks[1:]:
+        m = m.delete(k)
+    check(m, {ks[0]: 0})
+    m = m.delete(ks[0])
+    check(m, {})
+    assert pydrogen.Map(m, x = 1) == {'x': 1}
+
+def test_persistent_updates_and_pickling():
+    m = pydrogen.Map({'a': 1, 'b': 2})
+    n = m.set('c', 3).delete('a')
+    assert dict(m) == {'a': 1, 'b': 2} and dict(n) == {'b': 2, 'c': 3}
+    assert dict(pickle.loads(pickle.dumps(n))) == {'b': 2, 'c': 3}
+    with pytest.raises(KeyError):
+        m.delete('z')
+
+##eof
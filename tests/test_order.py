@@ -0,0 +1,64 @@
+#####################################################################
+##
+## test_order.py
+##
+##   Tests of the complexity classes (Order) used by the Complexity
+##   analysis: canonical forms, sums, products, containment, and the
+##   laws that memoized combinations rely on.
+##
+##
+
+import itertools
+import pickle
+
+import pytest
+
+from pydrogen import Order, PydrogenError
+
+n = Order('n')
+m = Order('m')
+one = Order()
+log = Order('n', 0, 1)
+exp = Order('n', 0, 0, 2)
+
+def test_sums_keep_dominant_terms():
+    assert n + one == n and one + n == n
+    assert n * n + n == Order('n', 2)
+    assert log + one == log and n + log == n
+    assert exp + Order('n', 10) == exp
+    assert (n + m).terms == (m + n).terms and len((n + m).terms) == 2
+    assert 0 + n == n and sum([n, one, 0]) == n and 3 + one == one
+
+def test_products():
+    assert n * n == Order('n', 2)
+    assert n * log == Order('n', 1, 1)
+    assert exp * exp == Order('n', 0, 0, 4)
+    assert n * m == m * n and n * one == n and 2 * n == n
+    assert repr(n * 0) == '0' and n * 0 + m == m
+    assert (n + m) * n == Order('n', 2) + m * n
+
+def test_contains():
+    assert Order('n', 2).contains(n) and not n.contains(Order('n', 2))
+    assert n.contains(log) and n.contains(one) and n.contains(1)
+    assert not n.contains(m) and (n + m).contains(m)
+    assert exp.contains(Order('n', 100)) and not Order('n', 100).contains(exp)
+    assert (m * n).contains(m + n) and not (m + n).contains(m * n)
+
+def test_laws():
+    classes = [one, n, m, log, exp, n * m, n + m, Order('m', 2) + log]
+    for (a, b, c) in itertools.product(classes, repeat = 3):
+        assert a + b == b + a and a * b == b * a
+        assert (a + b) + c == a + (b + c) and (a * b) * c == a * (b * c)
+        assert a * (b + c) == a * b + a * c
+        assert (a + b).contains(a) and (a * b).contains(a)
+        assert hash(a + b) == hash(b + a)
+
+def test_display_and_pickling():
+    assert repr(Order('n', 2) * log + m) == 'O(n**2*log(n) + m)'
+    assert repr(exp * m + Order('n', 2) * log) == 'O(m*2**n)'
+    assert repr(one) == 'O(1)'
+    assert pickle.loads(pickle.dumps(n * m + log)) == n * m + log
+    with pytest.raises(PydrogenError):
+        n + 'n'
+
+##eof
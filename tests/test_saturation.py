@@ -0,0 +1,70 @@
+#####################################################################
+##
+## test_saturation.py
+##
+##   Tests of early termination (see Saturated and the absorbing
+##   class attribute), which must give the same interpretations in
+##   the recursive, iterative, and fused engines.
+##
+##
+
+import ast
+
+import pydrogen
+
+class Ty(pydrogen.Typical):
+    absorbing = ('Error',)
+    def Statements(self, ss): return ss.post()[-1]
+    def If(self, test, body, orelse): return body.post() # The test and orelse are ignored.
+    def Expr(self, e): return e.post()
+    def Num(self, n): return 'Int'
+    def Str(self, s): return 'Error'
+    def True_(self): return 'Bool'
+    def Add(self, e1, e2): return 'Int' if (e1.post(), e2.post()) == ('Int', 'Int') else 'Error'
+    def BoolOp(self, es): return 'Bool' if all(t == 'Bool' for t in es.stream()) else 'Error'
+    def List(self, es): return next(es.stream()) # The first element.
+    def Call(self, func, args):
+        if func.pre().id == 'stop':
+            raise pydrogen.Saturated('Stopped')
+        return 'Int'
+
+sources = {
+    'unrequested orelse': "def f():\n    if 1:\n        return 1\n    else:\n        return 'x'\n",
+    'unrequested test': "def f():\n    if 'x':\n        return 1\n",
+    'requested body': "def f():\n    if 1:\n        return 'x'\n    return 1\n",
+    'nested': "def f():\n    return 1 + (2 + 'x')\n",
+    'early statement': "def f():\n    1 + 'x'\n    return 1\n",
+    'stream stops first': "def f():\n    return 1 and 'x'\n",
+    'stream reaches': "def f():\n    return True and 'x'\n",
+    'first of list': "def f():\n    return [1, 'x']\n",
+    'handler': "def f():\n    1 + stop()\n    return 'x'\n",
+    'unsaturated': "def f():\n    1 + 2\n    return 3\n",
+}
+
+def engines(cls, tree):
+    return {
+        'recursive': object.__new__(cls).analyze(tree, pydrogen.Map()),
+        'iterative': object.__new__(type(cls.__name__, (cls,), {'iterative': True})).analyze(tree, pydrogen.Map()),
+        'fused': pydrogen.fuse(cls)(tree)[cls.__name__]
+    }
+
+def test_engines_agree():
+    expected = {
+        'unrequested orelse': 'Int', 'unrequested test': 'Int', 'requested body': 'Error',
+        'nested': 'Error', 'early statement': 'Error', 'stream stops first': 'Error',
+        'stream reaches': 'Error', 'first of list': 'Int', 'handler': 'Stopped', 'unsaturated': 'Int'
+    }
+    for (name, source) in sources.items():
+        values = engines(Ty, ast.parse(source))
+        assert set(values.values()) == {expected[name]}, (name, values)
+
+def test_unabsorbed():
+    NoAbsorbing = type('NoAbsorbing', (Ty,), {'absorbing': ()})
+    assert set(engines(NoAbsorbing, ast.parse(sources['early statement'])).values()) == {'Int'}
+
+def test_interned():
+    Interned = type('Interned', (Ty,), {'interner': pydrogen.Interner()})
+    for source in (sources['nested'], sources['nested']): # The second time, the subtrees are found.
+        assert set(engines(Interned, ast.parse(source)).values()) == {'Error'}
+
+##eof